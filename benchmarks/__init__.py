@@ -0,0 +1,15 @@
+"""
+Benchmark and load-test suite for the Python services in this repo.
+
+    python -m benchmarks                      # all suites -> JSON on stdout
+    python -m benchmarks influencer campaign -o run.json
+    python -m benchmarks --quick -o quick.json
+    python -m benchmarks.compare before.json after.json
+
+Each suite (influencer, campaign, face) runs in its own subprocess, so the
+services' sibling-module imports and heavy dependencies stay isolated. A
+suite reports micro-benchmarks of its hot functions and, for the FastAPI
+apps, an in-process HTTP load test (no sockets, see asgi.py) at several
+concurrency levels. Every timing block has the same shape: n, mean/p50/
+p95/p99 in ms, and throughput.
+"""
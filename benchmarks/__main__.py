@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.harness import REPO_ROOT, environment
+
+SUITES = ["influencer", "campaign", "face"]
+
+
+def run_suite(name, quick=False, extra_args=()):
+    """Runs one suite in a fresh interpreter; returns its JSON result, or an error record."""
+    fd, result_path = tempfile.mkstemp(prefix=f"bench-{name}-", suffix=".json")
+    os.close(fd)
+    command = [sys.executable, "-m", f"benchmarks.{name}", "--json", result_path, *extra_args]
+    if quick:
+        command.append("--quick")
+
+    start = time.perf_counter()
+    # Service output (training logs, prints) goes to the log, not into the JSON
+    completed = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    elapsed_s = round(time.perf_counter() - start, 2)
+    try:
+        if completed.returncode != 0:
+            stderr = completed.stderr.strip().splitlines()
+            return {"suite": name, "error": stderr[-1] if stderr else f"exit code {completed.returncode}",
+                    "elapsed_s": elapsed_s}
+        with open(result_path) as f:
+            result = json.load(f)
+        result.pop("environment", None)
+        result["elapsed_s"] = elapsed_s
+        return result
+    finally:
+        os.remove(result_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run benchmark suites; JSON results.")
+    parser.add_argument("suites", nargs="*", help=f"subset of {SUITES} (default: all)")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations and smaller data (smoke run)")
+    parser.add_argument("--faces", help="face photo directory for the face suite")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s) {unknown}; choose from {SUITES}")
+
+    report = {"environment": environment(), "quick": args.quick, "suites": {}}
+    for name in args.suites or SUITES:
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        extra = ["--faces", os.path.abspath(args.faces)] if name == "face" and args.faces else []
+        report["suites"][name] = run_suite(name, args.quick, extra)
+        if "error" in report["suites"][name]:
+            print(f"  {name} failed: {report['suites'][name]['error']}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
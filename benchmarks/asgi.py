@@ -0,0 +1,135 @@
+"""
+In-process HTTP driver for ASGI apps: requests are delivered straight to
+app(scope, receive, send) on the current event loop, so a load test
+measures the app (routing, validation, handlers, thread pools) without
+socket or client-library overhead.
+"""
+import asyncio
+import json
+import time
+import uuid
+from benchmarks.harness import summarize
+
+
+class Lifespan:
+    """Runs the app's startup handlers on enter and shutdown handlers on exit."""
+
+    def __init__(self, app):
+        self.app = app
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        self.task = None
+
+    async def _receive(self):
+        return await self.incoming.get()
+
+    async def _send(self, message):
+        await self.outgoing.put(message)
+
+    async def __aenter__(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self.task = asyncio.create_task(self.app(scope, self._receive, self._send))
+        await self.incoming.put({"type": "lifespan.startup"})
+        message = await self.outgoing.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"App startup failed: {message.get('message')}")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.incoming.put({"type": "lifespan.shutdown"})
+        await self.outgoing.get()
+        await self.task
+
+
+def json_body(payload):
+    return json.dumps(payload).encode(), [(b"content-type", b"application/json")]
+
+
+def multipart_body(files=None, fields=None):
+    """files: {name: (filename, bytes, content_type)}, fields: {name: str}."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, data, content_type) in (files or {}).items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), [(b"content-type", f"multipart/form-data; boundary={boundary}".encode())]
+
+
+async def request(app, method, path, body=b"", headers=()):
+    """Sends one request through the app. Returns (status, response headers, body bytes)."""
+    headers = list(headers) + [(b"content-length", str(len(body)).encode()), (b"host", b"bench")]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    body_sent = False
+    response = {"status": None, "headers": [], "body": []}
+
+    async def receive():
+        nonlocal body_sent
+        if body_sent:
+            # Nothing more to read; park like a client that keeps the connection open
+            await asyncio.Event().wait()
+        body_sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], b"".join(response["body"])
+
+
+async def load_test(app, method, path, make_request, concurrency, total_requests):
+    """
+    Closed-loop load: `concurrency` virtual clients send requests back to
+    back until total_requests are done. make_request() -> (body, headers).
+    Returns summarize() of the latencies plus error counts by status.
+    """
+    latencies = []
+    statuses = {}
+    remaining = total_requests
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            body, headers = make_request()
+            start = time.perf_counter()
+            status, _, _ = await request(app, method, path, body, headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    wall_s = time.perf_counter() - start
+
+    result = {"concurrency": concurrency, **summarize(latencies, wall_s)}
+    result["statuses"] = {str(status): count for status, count in sorted(statuses.items())}
+    result["errors"] = sum(count for status, count in statuses.items() if status is None or status >= 400)
+    return result
+
+
+async def load_sweep(app, method, path, make_request, levels=(1, 4, 16, 64), requests_per_level=200):
+    return [await load_test(app, method, path, make_request, level, requests_per_level) for level in levels]
@@ -0,0 +1,55 @@
+"""
+Campaign model: data generation, CSV vs cached loading, in-memory and
+streaming training, and single vs batch prediction.
+"""
+import argparse
+import os
+import tempfile
+import numpy as np
+from benchmarks.harness import bench, environment, timed_once, use_service, write_result
+
+
+def run(quick=False):
+    use_service("campaign")
+    from campaign_model.campaign_model import CampaignModel
+    from campaign_model.generate_data import generate_campaign_data, iter_campaign_data, write_chunks
+
+    rows = 200_000 if quick else 2_000_000
+    result = {"suite": "campaign", "rows": rows, "setup": {}, "micro": {}}
+    micro = result["micro"]
+    micro["generate_legacy_10000"] = bench(generate_campaign_data, 10000, legacy=True, repeat=1, warmup=0)
+    micro["generate_vectorized_10000"] = bench(generate_campaign_data, 10000, repeat=20)
+
+    data_path = os.path.join(tempfile.mkdtemp(prefix="bench-campaign-"), "campaign_data.csv")
+    _, result["setup"]["write_csv_ms"] = timed_once(write_chunks, iter_campaign_data(rows), data_path)
+
+    model = CampaignModel(data_path)
+    _, result["setup"]["load_csv_build_cache_ms"] = timed_once(model.load_data)
+    result["setup"]["load_info_cold"] = model.load_info
+    cached = CampaignModel(data_path)
+    _, result["setup"]["load_cached_ms"] = timed_once(cached.load_data)
+    result["setup"]["load_info_cached"] = cached.load_info
+    plain = CampaignModel(data_path)
+    _, result["setup"]["load_csv_uncached_ms"] = timed_once(plain.load_data, use_cache=False)
+
+    _, result["setup"]["train_in_memory_ms"] = timed_once(model.train_model)
+    streaming = CampaignModel(data_path)
+    _, result["setup"]["train_streaming_ms"] = timed_once(streaming.train_model_streaming)
+
+    campaign = {
+        'campaign_duration_days': 30, 'influencer_count': 5, 'campaign_cost': 5000, 'impressions': 20000,
+        'clicks': 800, 'likes': 1500, 'comments': 100, 'saves': 50
+    }
+    micro["predict_campaign_1"] = bench(model.predict_campaign, campaign, repeat=200 if quick else 1000)
+    candidates = model.df[model.features].to_numpy(dtype=np.float64)[:100_000]
+    micro["predict_many_100000"] = bench(model.predict_many, candidates, repeat=20)
+    micro["roi_many_100000"] = bench(model.roi_many, candidates, repeat=20)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", required=True, help="result file")
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    write_result({"environment": environment(), **run(args.quick)}, os.path.abspath(args.json))
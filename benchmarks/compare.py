@@ -0,0 +1,65 @@
+"""
+Side-by-side comparison of two benchmark runs:
+
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.compare before.json after.json --metric p99_ms --json
+
+Every timing block present in both runs is listed with its value in each
+run and the relative change (negative = faster for latency metrics).
+"""
+import argparse
+import json
+
+
+def timing_blocks(node, path=""):
+    """Yields (path, block) for every dict carrying latency stats; load sweeps are keyed by concurrency."""
+    if isinstance(node, dict):
+        if "p50_ms" in node:
+            yield path, node
+            return
+        for key, value in node.items():
+            yield from timing_blocks(value, f"{path}/{key}" if path else key)
+    elif isinstance(node, list):
+        for i, value in enumerate(node):
+            label = f"c={value['concurrency']}" if isinstance(value, dict) and "concurrency" in value else str(i)
+            yield from timing_blocks(value, f"{path}/{label}")
+
+
+def compare(before, after, metric="p50_ms"):
+    old = dict(timing_blocks(before.get("suites", before)))
+    new = dict(timing_blocks(after.get("suites", after)))
+    rows = []
+    for path in old:
+        if path in new and old[path].get(metric) is not None and new[path].get(metric) is not None:
+            a, b = old[path][metric], new[path][metric]
+            rows.append({"benchmark": path, "before": a, "after": b,
+                         "change_pct": round((b - a) / a * 100, 1) if a else None})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--metric", default="p50_ms", help="p50_ms, p95_ms, p99_ms, mean_ms or throughput_per_s")
+    parser.add_argument("--json", action="store_true", help="print JSON rows instead of a table")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    rows = compare(before, after, args.metric)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    width = max([len(row["benchmark"]) for row in rows] + [9])
+    print(f"{'benchmark':<{width}}  {'before':>12}  {'after':>12}  {'change':>8}   ({args.metric})")
+    for row in rows:
+        change = "" if row["change_pct"] is None else f"{row['change_pct']:+.1f}%"
+        print(f"{row['benchmark']:<{width}}  {row['before']:>12.4f}  {row['after']:>12.4f}  {change:>8}")
+
+
+if __name__ == "__main__":
+    main()
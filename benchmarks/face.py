@@ -0,0 +1,113 @@
+"""
+Face verification: detection, embedding, FaceVerifier.verify,
+IDVerifier.verify_user and an in-process load test of /verify.
+
+Synthetic images are face photos pasted onto textured backgrounds
+(bench_detection.make_scene). Pass --faces DIR (or set BENCH_FACES_DIR) to
+use real face photos. The default stand-in ellipses are not detected as
+faces, so without --faces only detection and embedding are timed; the
+verify benchmarks would time the no-face error path and are skipped.
+
+The /verify load test sends a different profile photo with every request,
+so it measures uncached verification; a second sweep repeats one profile
+to measure the embedding cache.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import cv2
+import numpy as np
+from benchmarks.asgi import Lifespan, load_sweep, multipart_body
+from benchmarks.harness import bench, environment, timed_once, use_service, write_result
+
+SELFIE_SIZE = (1280, 960)
+PHONE_SIZE = (4000, 3000)
+
+
+def run(quick=False, faces_dir=None):
+    use_service("face")
+    # The app keeps its face index and caches relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench-face-"))
+    from bench_detection import load_faces, make_scene, synthetic_faces
+    from bench_ocr import render_card
+    from id_verification import IDVerifier
+    from verification import FaceVerifier
+
+    rng = np.random.default_rng(0)
+    faces = load_faces(faces_dir) if faces_dir else synthetic_faces(2)
+    selfie = make_scene(rng, faces[0], SELFIE_SIZE)
+    profile = make_scene(rng, faces[0], SELFIE_SIZE)
+    phone_photo = make_scene(rng, faces[0], PHONE_SIZE)
+    id_card, _ = render_card(rng)
+    repeat = 5 if quick else 30
+
+    result = {"suite": "face", "real_faces": bool(faces_dir), "setup": {}, "micro": {}, "http": {}}
+    verifier = FaceVerifier()
+    result["setup"]["warm_up_ms"] = timed_once(verifier.warm_up)[1]
+    micro = result["micro"]
+    micro["detect_face_1280x960"] = bench(verifier.detect_face, selfie, enforce_detection=False, repeat=repeat)
+    micro["detect_face_4000x3000"] = bench(verifier.detect_face, phone_photo, enforce_detection=False, repeat=repeat)
+    full_res = FaceVerifier(detect_max_side=None)
+    full_res.warm_up()
+    micro["detect_face_4000x3000_full_res"] = bench(full_res.detect_face, phone_photo, enforce_detection=False, repeat=repeat)
+    face, _ = verifier.detect_face(selfie, enforce_detection=False)
+    micro["embed_face"] = bench(verifier.embed_face, face, repeat=repeat)
+    if not faces_dir:
+        result["skipped"] = "verify benchmarks need --faces: no face is detected in the stand-in images"
+        return result
+    micro["verify"] = bench(verifier.verify, profile, selfie, repeat=repeat)
+
+    id_verifier = IDVerifier(ocr_preprocess="balanced")
+    id_verifier.face_verifier.warm_up()
+    micro["verify_user_sequential"] = bench(id_verifier.verify_user, id_card, selfie, concurrent=False, repeat=max(repeat // 2, 3), warmup=1)
+    micro["verify_user_concurrent"] = bench(id_verifier.verify_user, id_card, selfie, concurrent=True, repeat=max(repeat // 2, 3), warmup=1)
+
+    import app as face_app
+    levels = (1, 4) if quick else (1, 4, 16)
+    per_level = 10 if quick else 60
+    selfie_jpeg = cv2.imencode(".jpg", selfie)[1].tobytes()
+    # One fresh scene per request, so no profile is ever served from the app's embedding cache
+    profiles = [
+        cv2.imencode(".jpg", make_scene(rng, faces[i % len(faces)], SELFIE_SIZE))[1].tobytes()
+        for i in range(len(levels) * per_level)
+    ]
+    next_profile = iter(profiles).__next__
+
+    def verify_files(profile_jpeg):
+        return {
+            "profile_image": ("profile.jpg", profile_jpeg, "image/jpeg"),
+            "live_image": ("live.jpg", selfie_jpeg, "image/jpeg"),
+        }
+
+    async def http():
+        async with Lifespan(face_app.app):
+            # Startup warms the models in the background; wait until /ready would say so
+            while not face_app.warmup_state["ready"]:
+                if face_app.warmup_state["error"]:
+                    raise RuntimeError(f"Warm-up failed: {face_app.warmup_state['error']}")
+                await asyncio.sleep(0.05)
+            result["http"]["POST /verify"] = await load_sweep(
+                face_app.app, "POST", "/verify", lambda: multipart_body(verify_files(next_profile())), levels, per_level
+            )
+            result["http"]["POST /verify (repeated profile, cached)"] = await load_sweep(
+                face_app.app, "POST", "/verify", lambda: multipart_body(verify_files(profiles[0])), levels, per_level
+            )
+            result["http"]["GET /health"] = await load_sweep(
+                face_app.app, "GET", "/health", lambda: (b"", []), levels, per_level * 10
+            )
+
+    asyncio.run(http())
+    result["http"]["pool"] = face_app.verification_pool.stats()
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", required=True, help="result file")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--faces", default=os.environ.get("BENCH_FACES_DIR"), help="directory of face photos")
+    args = parser.parse_args()
+    output = os.path.abspath(args.json)
+    faces_dir = os.path.abspath(args.faces) if args.faces else None
+    write_result({"environment": environment(), **run(args.quick, faces_dir)}, output)
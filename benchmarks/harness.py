@@ -0,0 +1,84 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICE_DIRS = {
+    "influencer": os.path.join(REPO_ROOT, "influencer-analysis", "ml-server"),
+    "face": os.path.join(REPO_ROOT, "face_verification"),
+    "campaign": REPO_ROOT,
+}
+
+
+def use_service(name):
+    """Puts a service directory first on sys.path (services import their modules as siblings)."""
+    path = SERVICE_DIRS[name]
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return path
+
+
+def summarize(latencies_ms, wall_s=None):
+    """Latency percentiles (ms) and throughput for a list of per-call latencies."""
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    if len(latencies) == 0:
+        return {"n": 0}
+    wall_s = latencies.sum() / 1000 if wall_s is None else wall_s
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "n": int(len(latencies)),
+        "mean_ms": round(float(latencies.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(latencies.max()), 4),
+        "throughput_per_s": round(len(latencies) / wall_s, 2) if wall_s > 0 else None
+    }
+
+
+def bench(fn, *args, repeat=100, warmup=3, min_time_s=0.0, **kwargs):
+    """
+    Times fn(*args, **kwargs) `repeat` times (more if min_time_s isn't reached)
+    after `warmup` untimed calls. Returns summarize() of the calls.
+    """
+    for _ in range(warmup):
+        fn(*args, **kwargs)
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < repeat or time.perf_counter() - start < min_time_s:
+        call_start = time.perf_counter()
+        fn(*args, **kwargs)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    return summarize(latencies)
+
+
+def timed_once(fn, *args, **kwargs):
+    """Runs fn once; returns (result, milliseconds). For expensive setup steps (training, generation)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round((time.perf_counter() - start) * 1000, 2)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "git_commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+
+
+def write_result(result, path):
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
@@ -0,0 +1,80 @@
+"""
+Influencer ML server: training, data generation, the scoring hot path and
+an in-process load test of /predict and /predict/batch.
+
+The scoring sweeps run with the /predict result cache switched off, so they
+measure inference; the cache is measured separately with one repeated payload.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import numpy as np
+from benchmarks.asgi import Lifespan, json_body, load_sweep
+from benchmarks.harness import bench, environment, timed_once, use_service, write_result
+
+
+def run(quick=False):
+    use_service("influencer")
+    # The server loads model.joblib / model_flat from its working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench-influencer-"))
+    import train_model
+
+    result = {"suite": "influencer", "setup": {}, "micro": {}, "http": {}}
+    _, result["setup"]["train_ms"] = timed_once(train_model.train)
+    result["micro"]["generate_data_2000"] = bench(train_model.generate_data, 2000, repeat=5 if quick else 20)
+    rows = 200_000 if quick else 1_000_000
+    result["micro"][f"generate_data_chunks_{rows}"] = bench(
+        lambda: sum(len(chunk) for chunk in train_model.generate_data_chunks(rows)), repeat=1 if quick else 3, warmup=0
+    )
+
+    import joblib
+    import main
+    rng = np.random.default_rng(0)
+    single = np.array([[50000, 120000, 9000, 400]], dtype=np.int64)
+    batch = np.column_stack([
+        rng.integers(100, 1000000, 1000), rng.integers(10, 5000000, 1000),
+        rng.integers(0, 100000, 1000), rng.integers(0, 10000, 1000)
+    ]).astype(np.int64)
+    repeat = 200 if quick else 2000
+
+    async def http():
+        async with Lifespan(main.app):
+            micro = result["micro"]
+            micro["score_matrix_1"] = bench(main.score_matrix, single, repeat=repeat)
+            micro["score_matrix_1000"] = bench(main.score_matrix, batch, repeat=repeat // 10)
+            micro["flat_predict_proba_1"] = bench(main.predict_proba, main.model, single, repeat=repeat)
+            sklearn_model = joblib.load(main.MODEL_PATH)
+            micro["sklearn_predict_proba_1"] = bench(main.predict_proba, sklearn_model, single, repeat=repeat // 10)
+
+            payloads = [dict(zip(main.FEATURES, map(int, row))) for row in batch]
+            next_payload = iter(payloads * 1000).__next__
+            batch_payload = {name: batch[:100, i].tolist() for i, name in enumerate(main.FEATURES)}
+            levels = (1, 8, 32) if quick else (1, 4, 16, 64)
+            per_level = 200 if quick else 2000
+
+            result_cache, main.result_cache = main.result_cache, None
+            result["http"]["POST /predict"] = await load_sweep(
+                main.app, "POST", "/predict", lambda: json_body(next_payload()), levels, per_level
+            )
+            result["http"]["POST /predict/batch (100 rows)"] = await load_sweep(
+                main.app, "POST", "/predict/batch", lambda: json_body(batch_payload), levels, per_level // 4
+            )
+            main.result_cache = result_cache
+            if result_cache is not None:
+                result["http"]["POST /predict (repeated payload, cached)"] = await load_sweep(
+                    main.app, "POST", "/predict", lambda: json_body(payloads[0]), levels, per_level
+                )
+                result["http"]["result_cache"] = result_cache.stats()
+
+    asyncio.run(http())
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", required=True, help="result file")
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    output = os.path.abspath(args.json)
+    write_result({"environment": environment(), **run(args.quick)}, output)
@@ -1,8 +1,68 @@
+import time
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression
+from sklearn.inspection import permutation_importance
 from sklearn.metrics import mean_squared_error, r2_score
+from campaign_model.data_cache import ColumnarCache
+from campaign_model import model_sweep
+
+# Explicit CSV dtypes: no type inference, counts stored compactly
+COLUMN_DTYPES = {
+    'campaign_duration_days': 'int32',
+    'influencer_count': 'int32',
+    'campaign_cost': 'float64',
+    'impressions': 'int64',
+    'clicks': 'int32',
+    'likes': 'int32',
+    'comments': 'int32',
+    'saves': 'int32',
+    'sales_uplift': 'float64'
+}
+HOLDOUT_BUCKETS = 10000
+# Held-out rows used for permutation importance of models without coefficients
+IMPORTANCE_ROWS = 10000
+
+def holdout_mask(df, test_size=0.2):
+    """
+    Deterministic train/test assignment from a hash of each row's values:
+    a row lands on the same side in every pass and every chunking, and
+    duplicate rows never straddle the split.
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return (hashes % HOLDOUT_BUCKETS) < int(test_size * HOLDOUT_BUCKETS)
+
+def merge_moments(moments, block):
+    """
+    Merges a block of rows into running (count, mean, co-moment matrix)
+    statistics (Chan et al. parallel update). Centered co-moments keep the
+    normal equations as well conditioned as fitting on centered data.
+    """
+    n_b = len(block)
+    if n_b == 0:
+        return moments
+    mean_b = block.mean(axis=0)
+    centered = block - mean_b
+    m2_b = centered.T @ centered
+    if moments is None:
+        return n_b, mean_b, m2_b
+
+    n_a, mean_a, m2_a = moments
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * (n_b / n), m2_a + m2_b + np.outer(delta, delta) * (n_a * n_b / n)
+
+def solve_moments(moments):
+    """Least-squares (coef, intercept) from moments of [X, y] (y last)."""
+    n, mean, m2 = moments
+    sxx, sxy = m2[:-1, :-1], m2[:-1, -1]
+    # Scale to unit diagonal before solving; undo on the way out
+    scale = np.sqrt(np.diag(sxx))
+    scale[scale == 0] = 1.0
+    coef_scaled = np.linalg.lstsq(sxx / np.outer(scale, scale), sxy / scale, rcond=None)[0]
+    coef = coef_scaled / scale
+    return coef, mean[-1] - mean[:-1] @ coef
 
 class CampaignModel:
     def __init__(self, data_path='campaign_data.csv'):
@@ -12,24 +72,52 @@ class CampaignModel:
                          'impressions', 'clicks', 'likes', 'comments', 'saves']
         self.target = 'sales_uplift'
         self.df = None
+        self.load_info = None
         self.X_train = None
         self.X_test = None
         self.y_train = None
         self.y_test = None
+        # Streaming mode keeps only summary statistics, never the rows
+        self.streaming = False
+        self.chunksize = None
+        self.test_size = 0.2
+        self.sweep_report = None
+        self.sweep_candidates = None
 
-    def load_data(self):
-        """Loads data from CSV."""
+    def load_data(self, use_cache=True):
+        """
+        Loads the feature and target columns from CSV. With use_cache, they
+        come from a compact binary cache next to the CSV (built on first
+        load, rebuilt when the CSV changes) instead of re-parsing it.
+        """
+        columns = self.features + [self.target]
         try:
-            self.df = pd.read_csv(self.data_path)
+            if use_cache:
+                self.df, self.load_info = ColumnarCache(self.data_path).load(
+                    columns, {c: COLUMN_DTYPES[c] for c in columns}
+                )
+            else:
+                start = time.perf_counter()
+                self.df = pd.read_csv(self.data_path)
+                self.load_info = {
+                    'source': 'csv',
+                    'rows': len(self.df),
+                    'load_ms': round((time.perf_counter() - start) * 1000, 2),
+                    'memory_mb': round(self.df.memory_usage(index=False, deep=True).sum() / 2**20, 2)
+                }
             print(f"Data loaded successfully. Shape: {self.df.shape}")
+            print(f"Loaded from {self.load_info['source']} in {self.load_info['load_ms']} ms, "
+                  f"{self.load_info['memory_mb']} MB")
         except FileNotFoundError:
             print(f"Error: File {self.data_path} not found.")
             raise
 
-    def train_model(self):
-        """Trains the Linear Regression model."""
+    def train_model(self, estimator=None):
+        """Trains the Linear Regression model (or the given estimator, e.g. a sweep winner)."""
         if self.df is None:
             self.load_data()
+        if estimator is not None:
+            self.model = estimator
         
         X = self.df[self.features]
         y = self.df[self.target]
@@ -37,13 +125,99 @@ class CampaignModel:
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
         self.model.fit(self.X_train, self.y_train)
+        # Evaluate on this split from now on, not on a previous streaming run's hash holdout
+        self.streaming = False
         print("Model trained successfully.")
 
+    def sweep_models(self, candidates=None, folds=5, workers=None):
+        """
+        K-fold cross-validation of several regressors (model_sweep.DEFAULT_CANDIDATES:
+        LinearRegression, Ridge and gradient boosting settings) on a process
+        pool. Returns the report; report['best'] has the lowest mean MSE.
+        """
+        if self.df is None:
+            self.load_data()
+        candidates = model_sweep.DEFAULT_CANDIDATES if candidates is None else list(candidates)
+        self.sweep_report = model_sweep.sweep(self.df[self.features], self.df[self.target], candidates, folds, workers)
+        self.sweep_candidates = candidates
+        best = self.sweep_report['candidates'][0]
+        print(f"Model sweep: {len(candidates)} candidates x {folds} folds in {self.sweep_report['wall_s']} s, "
+              f"best '{best['candidate']}' (MSE {best['mse_mean']:.2f} +/- {best['mse_std']:.2f}, R2 {best['r2_mean']:.4f})")
+        return self.sweep_report
+
+    def best_estimator(self):
+        """Fresh (unfitted) estimator of the last sweep's winner, for train_model(estimator=...)."""
+        if self.sweep_report is None:
+            raise ValueError("Run sweep_models() first.")
+        return model_sweep.make_estimator(next(c for c in self.sweep_candidates if c[0] == self.sweep_report['best']))
+
+    def _read_chunks(self, chunksize):
+        columns = self.features + [self.target]
+        return pd.read_csv(self.data_path, usecols=columns, dtype={c: COLUMN_DTYPES[c] for c in columns},
+                           chunksize=chunksize)
+
+    def train_model_streaming(self, chunksize=250000, test_size=0.2):
+        """
+        Out-of-core training for CSVs that don't fit in memory. Reads the file
+        in typed chunks, holds out rows by hash (holdout_mask) and accumulates
+        the centered normal-equation statistics of the training rows, then
+        solves for the same least-squares fit LinearRegression would produce.
+        Peak memory depends on chunksize, not on the file size.
+        """
+        moments = None
+        test_rows = 0
+        columns = self.features + [self.target]
+        for chunk in self._read_chunks(chunksize):
+            is_test = holdout_mask(chunk, test_size)
+            test_rows += int(is_test.sum())
+            moments = merge_moments(moments, chunk.loc[~is_test, columns].to_numpy(dtype=np.float64))
+        if moments is None:
+            raise ValueError(f"No training rows in {self.data_path}.")
+
+        coef, intercept = solve_moments(moments)
+        self.model = LinearRegression()
+        self.model.coef_ = coef
+        self.model.intercept_ = float(intercept)
+        self.model.feature_names_in_ = np.array(self.features, dtype=object)
+        self.model.n_features_in_ = len(self.features)
+
+        self.streaming = True
+        self.chunksize = chunksize
+        self.test_size = test_size
+        print(f"Model trained successfully (streaming: {moments[0]} train rows, {test_rows} held out).")
+
+    def _evaluate_streaming(self):
+        """Second pass over the file scoring only the held-out rows."""
+        sse, n, mean, m2 = 0.0, 0, 0.0, 0.0
+        coef, intercept = self.model.coef_, self.model.intercept_
+        for chunk in self._read_chunks(self.chunksize):
+            test = chunk[holdout_mask(chunk, self.test_size)]
+            if test.empty:
+                continue
+            y = test[self.target].to_numpy(dtype=np.float64)
+            residuals = y - (test[self.features].to_numpy(dtype=np.float64) @ coef + intercept)
+            sse += float(residuals @ residuals)
+            # Running total sum of squares of y for R2
+            n_b, mean_b = len(y), float(y.mean())
+            m2_b = float(((y - mean_b) ** 2).sum())
+            delta = mean_b - mean
+            m2 += m2_b + delta * delta * n * n_b / (n + n_b)
+            mean += delta * n_b / (n + n_b)
+            n += n_b
+        if n == 0:
+            raise ValueError("No held-out rows to evaluate.")
+        return sse / n, 1 - sse / m2
+
     def evaluate_model(self):
         """Evaluates the model and returns metrics."""
         if self.model is None:
             print("Model not trained yet.")
             return
+
+        if self.streaming:
+            mse, r2 = self._evaluate_streaming()
+            print(f"Model Evaluation:\nMean Squared Error: {mse:.2f}\nR2 Score: {r2:.2f}")
+            return mse, r2
         
         y_pred = self.model.predict(self.X_test)
         mse = mean_squared_error(self.y_test, y_pred)
@@ -53,10 +227,21 @@ class CampaignModel:
         return mse, r2
 
     def get_feature_importance(self):
-        """Returns feature coefficients."""
+        """
+        Returns feature coefficients. Models without coefficients (e.g. gradient
+        boosting) report permutation importance on held-out rows instead.
+        """
         if self.model is None:
             return {}
-        
+
+        if not hasattr(self.model, 'coef_'):
+            result = permutation_importance(self.model, self.X_test[:IMPORTANCE_ROWS], self.y_test[:IMPORTANCE_ROWS],
+                                            n_repeats=3, random_state=0)
+            return pd.DataFrame({
+                'Feature': self.features,
+                'Importance': result.importances_mean
+            }).sort_values(by='Importance', ascending=False)
+
         coefficients = pd.DataFrame({
             'Feature': self.features,
             'Coefficient': self.model.coef_
@@ -79,3 +264,37 @@ class CampaignModel:
         net_profit = predicted_uplift - campaign_cost
         roi = (net_profit / campaign_cost) * 100
         return roi
+
+    def _feature_matrix(self, X):
+        """
+        Validates a candidate batch once and returns it as a float64 (n, features)
+        array. DataFrames are reordered by column name; arrays must already be
+        in self.features order.
+        """
+        if isinstance(X, pd.DataFrame):
+            missing = [f for f in self.features if f not in X.columns]
+            if missing:
+                raise ValueError(f"Missing feature columns: {missing}")
+            X = X[self.features]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected a 2-D array with {len(self.features)} columns in order {self.features}, got shape {X.shape}.")
+        return X
+
+    def predict_many(self, X):
+        """Predicts sales uplift for a batch of campaigns in one X @ coef_ + intercept_ pass."""
+        X = self._feature_matrix(X)
+        if not hasattr(self.model, 'coef_'):
+            return self.model.predict(pd.DataFrame(X, columns=self.features))
+        return X @ self.model.coef_ + self.model.intercept_
+
+    def roi_many(self, X, predicted_uplift=None, avg_profit_per_sale=50):
+        """
+        Vectorized calculate_roi for a batch: ROI (%) per campaign, using the
+        batch's campaign_cost column and predict_many unless predictions are given.
+        """
+        X = self._feature_matrix(X)
+        if predicted_uplift is None:
+            predicted_uplift = self.predict_many(X)
+        campaign_cost = X[:, self.features.index('campaign_cost')]
+        return (predicted_uplift - campaign_cost) / campaign_cost * 100
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+HASH_BLOCK = 1 << 20
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def compact(values):
+    """
+    Narrowest safe dtype for a column: int32 when the integers fit,
+    float32 when every value survives the round trip, else unchanged.
+    """
+    if np.issubdtype(values.dtype, np.integer):
+        info = np.iinfo(np.int32)
+        if len(values) == 0 or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(np.int32)
+        return values
+    if np.issubdtype(values.dtype, np.floating) and values.dtype != np.float32:
+        narrowed = values.astype(np.float32)
+        if np.array_equal(narrowed.astype(values.dtype), values, equal_nan=True):
+            return narrowed
+    return values
+
+class ColumnarCache:
+    """
+    Binary cache of selected CSV columns: one .npy file per column in
+    `<csv>.cache/`, loaded as memory maps instead of re-parsing the CSV.
+
+    The cache is keyed by the CSV's size, mtime and content hash. A changed
+    size invalidates it at once; a changed mtime with the same size (e.g. a
+    touch or a re-copy) triggers a hash check and the cache is reused if the
+    content is identical. Builds are staged and swapped in by rename.
+    """
+
+    def __init__(self, csv_path, cache_dir=None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir or f"{csv_path}.cache"
+
+    def _source_key(self):
+        stat = os.stat(self.csv_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.cache_dir, META_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def is_valid(self, columns):
+        meta = self._read_meta()
+        if meta is None or not set(columns) <= set(meta['columns']):
+            return False
+        key = self._source_key()
+        if meta['size'] != key['size']:
+            return False
+        if meta['mtime_ns'] == key['mtime_ns']:
+            return True
+        if meta['hash'] == file_hash(self.csv_path):
+            # Same content, new mtime: remember it so the next load takes the fast path
+            meta['mtime_ns'] = key['mtime_ns']
+            with open(os.path.join(self.cache_dir, META_FILE), 'w') as f:
+                json.dump(meta, f)
+            return True
+        return False
+
+    def build(self, columns, dtypes=None):
+        """Parses the CSV once (only `columns`) and writes the compacted arrays."""
+        key = self._source_key()
+        content_hash = file_hash(self.csv_path)
+        df = pd.read_csv(self.csv_path, usecols=columns, dtype=dtypes)
+
+        staging = f"{self.cache_dir}.tmp-{os.getpid()}"
+        os.makedirs(staging, exist_ok=True)
+        stored_dtypes = {}
+        for column in columns:
+            values = compact(df[column].to_numpy())
+            np.save(os.path.join(staging, f"{column}.npy"), values)
+            stored_dtypes[column] = str(values.dtype)
+        with open(os.path.join(staging, META_FILE), 'w') as f:
+            json.dump({**key, 'hash': content_hash, 'columns': columns, 'dtypes': stored_dtypes}, f)
+
+        if os.path.exists(self.cache_dir):
+            retired = f"{self.cache_dir}.old-{os.getpid()}"
+            os.rename(self.cache_dir, retired)
+            os.rename(staging, self.cache_dir)
+            shutil.rmtree(retired)
+        else:
+            os.rename(staging, self.cache_dir)
+
+    def load(self, columns, dtypes=None):
+        """
+        Returns (DataFrame of `columns`, info). Builds the cache first if it
+        is missing or stale. info reports the source, load time and memory.
+        """
+        start = time.perf_counter()
+        source = 'cache'
+        if not self.is_valid(columns):
+            self.build(columns, dtypes)
+            source = 'csv'
+        df = pd.DataFrame({
+            column: np.load(os.path.join(self.cache_dir, f"{column}.npy"), mmap_mode='r')
+            for column in columns
+        }, copy=False)
+        info = {
+            'source': source,
+            'rows': len(df),
+            'load_ms': round((time.perf_counter() - start) * 1000, 2),
+            'memory_mb': round(df.memory_usage(index=False).sum() / 2**20, 2),
+            'dtypes': {column: str(df[column].dtype) for column in columns}
+        }
+        return df, info
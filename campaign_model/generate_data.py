@@ -1,36 +1,92 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
 import random
 
-def generate_campaign_data(num_samples=100):
+COLUMNS = ['campaign_duration_days', 'influencer_count', 'campaign_cost', 'impressions',
+           'clicks', 'likes', 'comments', 'saves', 'sales_uplift']
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+def _generate_chunk(rng, n):
+    """One block of n campaigns, drawn column by column from a numpy Generator."""
+    # Independent variables (Features)
+    campaign_duration_days = rng.integers(5, 60, n)
+    influencer_count = rng.integers(1, 20, n)
+    campaign_cost = rng.uniform(1000, 50000, n)
+
+    # Engagement metrics (correlated with cost and influencers)
+    base_engagement = (campaign_cost / 100) * (influencer_count * 0.5)
+
+    impressions = (base_engagement * rng.uniform(50, 150, n)).astype(np.int64)
+    clicks = (impressions * rng.uniform(0.01, 0.05, n)).astype(np.int64)
+    likes = (impressions * rng.uniform(0.02, 0.08, n)).astype(np.int64)
+    comments = (likes * rng.uniform(0.05, 0.15, n)).astype(np.int64)
+    saves = (likes * rng.uniform(0.1, 0.3, n)).astype(np.int64)
+
+    # Dependent variable (Target): Sales Uplift, driven by Clicks and Saves more than Likes
+    sales_uplift = (clicks * 2.5) + (saves * 5.0) + (likes * 0.5) + (campaign_cost * 0.1) + (campaign_duration_days * 5.0)
+    sales_uplift *= rng.uniform(0.9, 1.1, n) # Add some noise
+
+    return pd.DataFrame({
+        'campaign_duration_days': campaign_duration_days,
+        'influencer_count': influencer_count,
+        'campaign_cost': np.round(campaign_cost, 2),
+        'impressions': impressions,
+        'clicks': clicks,
+        'likes': likes,
+        'comments': comments,
+        'saves': saves,
+        'sales_uplift': np.round(sales_uplift, 2)
+    })
+
+def iter_campaign_data(num_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=42):
+    """
+    Yields the dataset as DataFrames of at most chunk_size rows, so memory
+    stays bounded however many rows are requested. Chunk i draws from its
+    own Generator seeded by (seed, i): the same seed and chunk size always
+    give the same data, whether it's streamed or built in memory.
+    """
+    for i, start in enumerate(range(0, num_samples, chunk_size)):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i,)))
+        yield _generate_chunk(rng, min(chunk_size, num_samples - start))
+
+def generate_campaign_data(num_samples=100, seed=42, chunk_size=DEFAULT_CHUNK_SIZE, legacy=False):
     """
     Generates a synthetic dataset for marketing campaign analysis.
+    legacy=True reproduces the original row-by-row np.random.seed(42)
+    output exactly (slow; for comparing against older datasets).
     """
+    if legacy:
+        return _generate_campaign_data_legacy(num_samples)
+    return pd.concat(iter_campaign_data(num_samples, chunk_size, seed), ignore_index=True)
+
+def _generate_campaign_data_legacy(num_samples=100):
     np.random.seed(42)
-    
+
     data = []
-    
+
     for _ in range(num_samples):
         # Independent variables (Features)
         campaign_duration_days = np.random.randint(5, 60)
         influencer_count = np.random.randint(1, 20)
         campaign_cost = np.random.uniform(1000, 50000)
-        
+
         # Engagement metrics (correlated with cost and influencers)
         base_engagement = (campaign_cost / 100) * (influencer_count * 0.5)
-        
+
         impressions = int(base_engagement * np.random.uniform(50, 150))
         clicks = int(impressions * np.random.uniform(0.01, 0.05))
         likes = int(impressions * np.random.uniform(0.02, 0.08))
         comments = int(likes * np.random.uniform(0.05, 0.15))
         saves = int(likes * np.random.uniform(0.1, 0.3))
-        
+
         # Dependent variable (Target): Sales Uplift
         # Formula: Base + Noise + Function of engagement
         # Let's say sales uplift is driven by Clicks and Saves more than Likes
         sales_uplift = (clicks * 2.5) + (saves * 5.0) + (likes * 0.5) + (campaign_cost * 0.1) + (campaign_duration_days * 5.0)
         sales_uplift *= np.random.uniform(0.9, 1.1) # Add some noise
-        
+
         data.append({
             'campaign_duration_days': campaign_duration_days,
             'influencer_count': influencer_count,
@@ -42,14 +98,52 @@ def generate_campaign_data(num_samples=100):
             'saves': saves,
             'sales_uplift': round(sales_uplift, 2)
         })
-        
+
     df = pd.DataFrame(data)
     return df
 
+def write_chunks(chunks, output_file):
+    """
+    Streams DataFrame chunks to CSV, or Parquet for a .parquet path (needs
+    pyarrow). Written to a temp file and renamed, so readers never see a
+    partial dataset. Returns (rows written, first chunk).
+    """
+    tmp_file = f"{output_file}.tmp"
+    rows, first, writer = 0, None, None
+    try:
+        for chunk in chunks:
+            if output_file.endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_file, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp_file, mode='w' if first is None else 'a', header=first is None, index=False)
+            rows += len(chunk)
+            if first is None:
+                first = chunk
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_file, output_file)
+    return rows, first
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic campaign data.")
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--output', default='campaign_data.csv', help="a .csv or .parquet path")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--legacy', action='store_true', help="original row-by-row generator (seed 42, exact old output)")
+    args = parser.parse_args()
+
     print("Generating synthetic campaign data...")
-    df = generate_campaign_data()
-    output_file = 'campaign_data.csv'
-    df.to_csv(output_file, index=False)
-    print(f"Data saved to {output_file}")
-    print(df.head())
+    if args.legacy:
+        chunks = [_generate_campaign_data_legacy(args.rows)]
+    else:
+        chunks = iter_campaign_data(args.rows, args.chunk_size, args.seed)
+    rows, first = write_chunks(chunks, args.output)
+    print(f"{rows} rows saved to {args.output}")
+    print(first.head())
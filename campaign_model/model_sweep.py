@@ -0,0 +1,163 @@
+"""
+K-fold cross-validation sweep over several regressors for CampaignModel.
+
+The feature matrix, target and fold assignment are written once to .npy
+files and memory-mapped by every worker process, so tasks carry only a
+(candidate, fold) pair instead of a pickled copy of the data. Each task
+fits one candidate on k-1 folds and scores the held-out fold; the report
+holds per-fold timings and each candidate's mean/std MSE and R2, and names
+the candidate with the lowest mean MSE as the winner.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from threadpoolctl import threadpool_limits
+
+# (name, estimator class, constructor params); tree models first so the slowest tasks start first
+DEFAULT_CANDIDATES = [
+    ("gbr_lr0.1_leaves31", HistGradientBoostingRegressor, {"learning_rate": 0.1, "max_leaf_nodes": 31, "max_iter": 200, "random_state": 0}),
+    ("gbr_lr0.05_leaves63", HistGradientBoostingRegressor, {"learning_rate": 0.05, "max_leaf_nodes": 63, "max_iter": 300, "random_state": 0}),
+    ("linear", LinearRegression, {}),
+    ("ridge_alpha1", Ridge, {"alpha": 1.0}),
+    ("ridge_alpha100", Ridge, {"alpha": 100.0}),
+    ("ridge_alpha10000", Ridge, {"alpha": 10000.0}),
+]
+
+# Memory-mapped arrays of the current worker (set by _init_worker)
+_shared = {}
+
+
+def fold_ids(df, folds):
+    """
+    Fold number of every row from a hash of its values (cf. holdout_mask):
+    deterministic across runs, and duplicate rows always share a fold.
+    """
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return (hashes % folds).astype(np.int8)
+
+
+def make_estimator(candidate):
+    _, estimator_class, params = candidate
+    return estimator_class(**params)
+
+
+def _init_worker(directory, threads):
+    # BLAS/OpenMP pools sized so workers x threads doesn't oversubscribe the CPUs
+    threadpool_limits(threads)
+    for name in ("X", "y", "folds"):
+        _shared[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+
+def _run_fold(index, candidate, fold):
+    """Fits one candidate with `fold` held out; returns its scores and timings."""
+    X, y, folds = _shared["X"], _shared["y"], _shared["folds"]
+    is_test = folds == fold
+    # Fancy indexing copies only this task's rows out of the shared pages
+    X_train, y_train = X[~is_test], y[~is_test]
+    X_test, y_test = X[is_test], y[is_test]
+
+    estimator = make_estimator(candidate)
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    residuals = y_test - estimator.predict(X_test)
+    predict_ms = (time.perf_counter() - start) * 1000
+
+    mse = float(residuals @ residuals) / len(y_test)
+    total = float(((y_test - y_test.mean()) ** 2).sum())
+    return {
+        "candidate": candidate[0],
+        "index": index,
+        "fold": fold,
+        "train_rows": len(y_train),
+        "test_rows": len(y_test),
+        "mse": mse,
+        "r2": 1 - mse * len(y_test) / total if total else 0.0,
+        "fit_ms": round(fit_ms, 2),
+        "predict_ms": round(predict_ms, 2),
+        "worker_pid": os.getpid()
+    }
+
+
+def _summarize(candidate, runs):
+    mse = np.array([run["mse"] for run in runs])
+    r2 = np.array([run["r2"] for run in runs])
+    return {
+        "candidate": candidate[0],
+        "estimator": candidate[1].__name__,
+        "params": candidate[2],
+        "mse_mean": float(mse.mean()),
+        "mse_std": float(mse.std()),
+        "r2_mean": float(r2.mean()),
+        "r2_std": float(r2.std()),
+        "fit_ms_total": round(sum(run["fit_ms"] for run in runs), 2)
+    }
+
+
+def sweep(X, y, candidates=None, folds=5, workers=None):
+    """
+    Cross-validates every candidate on `folds` folds of (X, y), one
+    (candidate, fold) task per process-pool job. X is a DataFrame of the
+    feature columns, y the target Series. Returns the report dict.
+    """
+    candidates = DEFAULT_CANDIDATES if candidates is None else list(candidates)
+    if folds < 2:
+        raise ValueError("Cross-validation needs at least 2 folds.")
+    assignment = fold_ids(pd.concat([X, y], axis=1), folds)
+    if np.bincount(assignment, minlength=folds).min() == 0:
+        raise ValueError(f"Not enough distinct rows for {folds} folds.")
+
+    tasks = [(index, candidate, fold) for index, candidate in enumerate(candidates) for fold in range(folds)]
+    cpus = os.cpu_count() or 1
+    workers = min(workers or cpus, len(tasks))
+    threads = max(cpus // workers, 1)
+
+    directory = tempfile.mkdtemp(prefix="campaign-sweep-")
+    start = time.perf_counter()
+    try:
+        np.save(os.path.join(directory, "X.npy"), np.ascontiguousarray(X.to_numpy(dtype=np.float64)))
+        np.save(os.path.join(directory, "y.npy"), y.to_numpy(dtype=np.float64))
+        np.save(os.path.join(directory, "folds.npy"), assignment)
+        share_ms = (time.perf_counter() - start) * 1000
+
+        if workers == 1:
+            _init_worker(directory, threads)
+            runs = [_run_fold(*task) for task in tasks]
+            _shared.clear()
+        else:
+            # Spawned workers: no fork of the parent's DataFrame, they only map the .npy files
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(directory, threads)) as executor:
+                futures = [executor.submit(_run_fold, *task) for task in tasks]
+                runs = [future.result() for future in as_completed(futures)]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    runs.sort(key=lambda run: (run["index"], run["fold"]))
+    summaries = sorted(
+        (_summarize(candidate, [run for run in runs if run["index"] == index]) for index, candidate in enumerate(candidates)),
+        key=lambda summary: summary["mse_mean"]
+    )
+    for run in runs:
+        del run["index"]
+    return {
+        "rows": len(y),
+        "folds": folds,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "share_ms": round(share_ms, 2),
+        "wall_s": round(time.perf_counter() - start, 3),
+        "best": summaries[0]["candidate"],
+        "candidates": summaries,
+        "fold_runs": runs
+    }
@@ -1,20 +1,32 @@
+import argparse
 from campaign_model.campaign_model import CampaignModel
 import pandas as pd
 
-def run_analysis():
+def run_analysis(sweep=False, folds=5, workers=None):
+    """With sweep=True, cross-validates several models and trains the winner instead of LinearRegression."""
     print("Starting Campaign Analysis...")
     
     model = CampaignModel()
     model.load_data()
-    model.train_model()
+    if sweep:
+        report = model.sweep_models(folds=folds, workers=workers)
+        print("\n--- Model Sweep (k-fold cross-validation, best first) ---")
+        print(pd.DataFrame(report['candidates'])[['candidate', 'mse_mean', 'mse_std', 'r2_mean', 'fit_ms_total']].to_string(index=False))
+        model.train_model(estimator=model.best_estimator())
+        print(f"Selected model: {report['best']}")
+    else:
+        model.train_model()
     mse, r2 = model.evaluate_model()
     
     print("\n--- Feature Importance (Impact on Sales Uplift) ---")
     importance = model.get_feature_importance()
     print(importance)
     print("\nInterpretation:")
-    print("These coefficients represent the estimated 'Dollar Value' of each unit.")
-    print("For example, a coefficient of 2.5 for 'clicks' means each click adds approx $2.50 to Sales Uplift.")
+    if 'Coefficient' in importance.columns:
+        print("These coefficients represent the estimated 'Dollar Value' of each unit.")
+        print("For example, a coefficient of 2.5 for 'clicks' means each click adds approx $2.50 to Sales Uplift.")
+    else:
+        print("Importance is the increase in prediction error when a feature's values are shuffled.")
     top_feature = importance.iloc[0]['Feature']
     print(f"The most influential factor is '{top_feature}'.")
     
@@ -42,4 +54,9 @@ def run_analysis():
         print("Recommendation: Optimize costs or improve engagement to achieve positive ROI.")
 
 if __name__ == "__main__":
-    run_analysis()
+    parser = argparse.ArgumentParser(description="Campaign sales-uplift analysis.")
+    parser.add_argument("--sweep", action="store_true", help="cross-validate several models and use the best one")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, help="sweep worker processes (default: CPU count)")
+    args = parser.parse_args()
+    run_analysis(sweep=args.sweep, folds=args.folds, workers=args.workers)
@@ -0,0 +1,61 @@
+"""
+Scores a file of candidate campaign configurations with a CampaignModel and
+streams predicted sales uplift and ROI, chunk by chunk.
+
+    python -m campaign_model.score_candidates candidates.csv -o scored.csv
+    python -m campaign_model.score_candidates candidates.csv --data history.csv --streaming-train
+
+Candidates need the model's feature columns (any order, extra columns are
+carried through). Output is CSV: the candidate rows plus
+predicted_sales_uplift and roi_percent.
+"""
+import argparse
+import sys
+import time
+import pandas as pd
+from campaign_model.campaign_model import CampaignModel, COLUMN_DTYPES
+
+def score_file(model, candidates_path, output, chunksize=100000):
+    """Streams scored chunks of candidates_path to the open file `output`. Returns rows scored."""
+    rows = 0
+    dtypes = {f: COLUMN_DTYPES[f] for f in model.features}
+    for chunk in pd.read_csv(candidates_path, dtype=dtypes, chunksize=chunksize):
+        predictions = model.predict_many(chunk)
+        chunk['predicted_sales_uplift'] = predictions.round(2)
+        chunk['roi_percent'] = model.roi_many(chunk, predictions).round(2)
+        chunk.to_csv(output, header=rows == 0, index=False)
+        rows += len(chunk)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream predictions for candidate campaigns.")
+    parser.add_argument('candidates', help="CSV of candidate campaigns")
+    parser.add_argument('--data', default='campaign_data.csv', help="training data CSV")
+    parser.add_argument('-o', '--output', help="output CSV (default: stdout)")
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--streaming-train', action='store_true', help="train out-of-core on the data CSV")
+    args = parser.parse_args(argv)
+
+    model = CampaignModel(args.data)
+    # Progress goes to stderr so stdout can carry the scored CSV
+    stdout, sys.stdout = sys.stdout, sys.stderr
+    try:
+        if args.streaming_train:
+            model.train_model_streaming()
+        else:
+            model.train_model()
+    finally:
+        sys.stdout = stdout
+
+    start = time.perf_counter()
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        rows = score_file(model, args.candidates, output, args.chunksize)
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} candidates in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
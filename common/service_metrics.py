@@ -0,0 +1,292 @@
+"""
+Lightweight instrumentation shared by the Python services (imported through
+each service's metrics.py): per-stage latency histograms and other named
+histograms exported as Prometheus text, an optional per-request
+Server-Timing header and an opt-in sampling profiler that writes folded
+stacks (the input format of flamegraph.pl, speedscope and inferno).
+
+Stages are recorded with REGISTRY.timer("decode") or REGISTRY.record(timings)
+from anywhere in the request; one observation is a bisect and a short lock.
+"""
+import bisect
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Bucket upper bounds in milliseconds; exported in seconds as Prometheus expects
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stage timings of the request being served (set by MetricsMiddleware)
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (upper bounds; larger values land in "+Inf"),
+    cheap enough to update on every stage or batch. Latencies are in ms.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.samples = 0
+        self.peak = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.total += value
+            self.samples += 1
+            self.peak = max(self.peak, value)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.total, self.samples
+
+    def to_dict(self):
+        counts, total, samples = self.snapshot()
+        labels = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "buckets": dict(zip(labels, counts)),
+            "count": samples,
+            "mean": total / samples if samples else 0.0
+        }
+
+
+class Metrics:
+    """Stage, per-route request and named histograms for one process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.requests = {}
+        self.responses = Counter()
+        # name -> (histogram, help text), e.g. micro-batch sizes
+        self.histograms = {}
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = table.setdefault(key, Histogram())
+        return histogram
+
+    def histogram(self, name, buckets, help_text=""):
+        """Registers (or returns) a named histogram of unit-less values, exported as <namespace>_<name>."""
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = (Histogram(buckets), help_text)
+            return self.histograms[name][0]
+
+    def stage_summary(self):
+        """{stage: {count, mean_ms, max_ms}} of every stage recorded so far."""
+        summary = {}
+        for stage, histogram in sorted(self.stages.items()):
+            with histogram.lock:
+                count, total, peak = histogram.samples, histogram.total, histogram.peak
+            summary[stage] = {"count": count, "mean_ms": round(total / count, 2), "max_ms": round(peak, 2)}
+        return summary
+
+    def observe(self, stage, ms):
+        """Records one stage duration; also adds it to the current request's Server-Timing."""
+        self._histogram(self.stages, stage).observe(ms)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + ms
+
+    def record(self, timings, prefix=""):
+        """Records a {stage: milliseconds} dict, e.g. the timings_ms of a verification result."""
+        for stage, ms in timings.items():
+            self.observe(prefix + stage, ms)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def observe_request(self, method, route, status, ms):
+        self._histogram(self.requests, (method, route)).observe(ms)
+        with self.lock:
+            self.responses[(method, route, status)] += 1
+
+    def render(self, namespace, gauges=None, counters=None):
+        """
+        Prometheus text exposition of every histogram, plus optional {name: value}
+        gauges and counters (monotonic totals owned elsewhere, e.g. cache hits;
+        exported as <namespace>_<name>_total).
+        """
+        lines = []
+        _render_histograms(lines, f"{namespace}_stage_seconds", "Time spent per pipeline stage.",
+                           [({"stage": stage}, histogram) for stage, histogram in sorted(self.stages.items())], 1000)
+        _render_histograms(lines, f"{namespace}_http_request_seconds", "End-to-end request latency per route.",
+                           [({"method": method, "route": route}, histogram)
+                            for (method, route), histogram in sorted(self.requests.items())], 1000)
+        for name, (histogram, help_text) in sorted(self.histograms.items()):
+            _render_histograms(lines, f"{namespace}_{name}", help_text, [({}, histogram)])
+
+        name = f"{namespace}_http_responses_total"
+        lines += [f"# HELP {name} Responses per route and status code.", f"# TYPE {name} counter"]
+        with self.lock:
+            responses = sorted(self.responses.items())
+        for (method, route, status), count in responses:
+            lines.append(f"{name}{_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+        for counter, value in (counters or {}).items():
+            if value is not None:
+                lines += [f"# TYPE {namespace}_{counter}_total counter", f"{namespace}_{counter}_total {float(value)}"]
+        for gauge, value in (gauges or {}).items():
+            if value is not None:
+                lines += [f"# TYPE {namespace}_{gauge} gauge", f"{namespace}_{gauge} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _render_histograms(lines, name, help_text, series, divisor=1):
+    """Appends histogram series; divisor converts recorded units (e.g. 1000 for ms -> s)."""
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        counts, total, samples = histogram.snapshot()
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + [None], counts):
+            cumulative += count
+            le = "+Inf" if bound is None else repr(bound / divisor)
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {total / divisor}")
+        lines.append(f"{name}_count{_labels(labels)} {samples}")
+
+
+def server_timing(timings, total_ms=None):
+    """Formats {stage: ms} as a Server-Timing header value."""
+    entries = [f"{stage};dur={ms:.2f}" for stage, ms in timings.items()]
+    if total_ms is not None:
+        entries.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request per route and collects
+    the stages recorded while serving it. With server_timing=True the
+    stages are returned to the client in a Server-Timing header (visible
+    in browser dev tools and `curl -i`).
+
+    Stages recorded in run_in_threadpool calls are included. Stages recorded
+    on other executors or in other processes only reach the histograms,
+    unless the handler records timings they return (e.g. a face verification
+    result's timings_ms); a micro-batch serving many requests stays out of
+    their Server-Timing.
+    """
+
+    def __init__(self, app, metrics, server_timing=False):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = server_timing(timings, (time.perf_counter() - start) * 1000)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _request_timings.reset(token)
+            # Route template (e.g. /items/{id}) keeps label cardinality bounded; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.observe_request(scope["method"], route, status, (time.perf_counter() - start) * 1000)
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every Python thread in this process.
+    Every interval_ms a background thread snapshots all stacks with
+    sys._current_frames() and counts identical stacks; folded() renders
+    them one per line as "thread;outer;...;inner count".
+
+    Only one profile runs at a time, and only this process is sampled:
+    not process-pool workers (profile VERIFY_POOL=thread instead), and with
+    several uvicorn workers, only the one that received the request.
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self, interval_ms=5.0):
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+
+    def run(self, seconds):
+        """Samples for `seconds` (blocking the calling thread) and returns self."""
+        if not self._active.acquire(blocking=False):
+            raise RuntimeError("A profile is already running.")
+        try:
+            own = threading.get_ident()
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident != own:
+                        self.stacks[(names.get(ident, str(ident)),) + _stack(frame)] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+        finally:
+            self._active.release()
+        return self
+
+    def folded(self):
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def dump(self, directory):
+        """Writes the folded stacks to <directory>/profile-<timestamp>.folded; returns the path."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("profile-%Y%m%dT%H%M%S.folded"))
+        with open(path, "w") as f:
+            f.write(self.folded())
+        return path
+
+
+def _stack(frame):
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return tuple(reversed(frames))
+
+
+# Process-wide registry shared by the app and the pipeline modules
+REGISTRY = Metrics()
@@ -1,11 +1,16 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
-import shutil
+import asyncio
 import os
-import uuid
-from verification import FaceVerifier
+import time
+from verifier_factory import build_verifier
+from face_index import FaceIndex, IVFFaceIndex
+from metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, MetricsMiddleware, SamplingProfiler
+from upload_limits import MaxBodySizeMiddleware, UploadTooLarge, read_upload
+from worker_pool import VerificationPool, PoolSaturated
 
 app = FastAPI(title="Face Verification API", version="1.0")
 
@@ -17,50 +22,242 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-image upload limit; the whole request may carry two images plus multipart overhead
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MIN_IMAGE_BYTES = 1024 * 5
+app.add_middleware(MaxBodySizeMiddleware, max_bytes=2 * MAX_UPLOAD_BYTES + 64 * 1024)
 
-verifier = FaceVerifier(model_name="ArcFace", detector_backend="opencv")
+# Stage histograms are always collected (see /metrics); SERVER_TIMING=1 also returns them per request.
+# PROFILING_ENABLED=1 exposes POST /debug/profile, which writes folded stacks to PROFILE_DIR.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+MAX_PROFILE_SECONDS = 120
+app.add_middleware(MetricsMiddleware, metrics=REGISTRY, server_timing=SERVER_TIMING)
 
-TEMP_DIR = "temp_uploads"
-os.makedirs(TEMP_DIR, exist_ok=True)
+verifier = build_verifier()
+embedding_cache = verifier.embedding_cache
+
+# CPU-heavy verification runs on a bounded pool so the event loop stays responsive.
+# VERIFY_POOL=process gives each worker process its own model (no GIL sharing).
+verification_pool = VerificationPool(
+    verifier,
+    kind=os.environ.get("VERIFY_POOL", "thread"),
+    workers=int(os.environ.get("VERIFY_WORKERS", str(os.cpu_count() or 1))),
+    max_queue=int(os.environ.get("VERIFY_QUEUE_SIZE", "16")),
+    verifier_factory=build_verifier
+)
+RETRY_AFTER_SECONDS = int(os.environ.get("RETRY_AFTER_SECONDS", "1"))
+
+# Readiness: models are built and warmed at startup; /ready stays 503 until then
+warmup_state = {"ready": False, "error": None, "timings_ms": {}}
+
+# 1:N gallery of enrolled ArcFace embeddings, persisted under FACE_INDEX_DIR.
+# FACE_INDEX_TYPE=ivf switches to the approximate index (train it via /index/train).
+FACE_INDEX_DIR = os.environ.get("FACE_INDEX_DIR", "face_index")
+if os.environ.get("FACE_INDEX_TYPE", "flat") == "ivf":
+    face_index = IVFFaceIndex(
+        path=FACE_INDEX_DIR,
+        nlist=int(os.environ.get("FACE_INDEX_NLIST", "1024")),
+        nprobe=int(os.environ.get("FACE_INDEX_NPROBE", "16"))
+    )
+else:
+    face_index = FaceIndex(path=FACE_INDEX_DIR)
+
+async def read_image_bytes(upload):
+    with REGISTRY.timer("read"):
+        return await read_upload(upload, MAX_UPLOAD_BYTES)
+
+def too_large_response():
+    return JSONResponse(status_code=413, content={"verified": False, "message": f"Image exceeds {MAX_UPLOAD_BYTES} bytes."})
+
+def busy_response():
+    return JSONResponse(
+        status_code=429,
+        content={"verified": False, "message": "Verification workers are saturated, retry shortly."},
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+async def warm_up():
+    start = time.perf_counter()
+    try:
+        warmup_state["timings_ms"] = await verification_pool.warm_up()
+        warmup_state["timings_ms"]["total"] = round((time.perf_counter() - start) * 1000, 2)
+        warmup_state["ready"] = True
+        print(f"Models warmed up in {warmup_state['timings_ms']['total']} ms.")
+    except Exception as e:
+        warmup_state["error"] = str(e)
+        print(f"Warm-up failed: {e}")
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Runs in the background so liveness checks are answered while models load
+    asyncio.get_running_loop().create_task(warm_up())
+
+@app.on_event("shutdown")
+def shutdown_pool():
+    verification_pool.shutdown()
+
+@app.get("/health")
+def health():
+    return {"status": "Face Verification API Running"}
+
+@app.get("/ready")
+def ready():
+    if not warmup_state["ready"]:
+        return JSONResponse(status_code=503, content=warmup_state)
+    return warmup_state
+
+@app.get("/pool/stats")
+def pool_stats():
+    return verification_pool.stats()
+
+def local_cache_stats():
+    """
+    The app's embedding cache stats, or None with VERIFY_POOL=process: each
+    worker process then builds its own cache and this one is never used.
+    """
+    if verification_pool.kind == "process":
+        return None
+    return embedding_cache.stats()
+
+@app.get("/cache/stats")
+def cache_stats():
+    cache = local_cache_stats()
+    if cache is None:
+        return {"available": False, "reason": "VERIFY_POOL=process: each worker process keeps its own embedding cache."}
+    return cache
+
+@app.get("/metrics")
+def metrics():
+    # Cache series are left out in process mode rather than exported as a constant 0
+    cache = local_cache_stats() or {}
+    text = REGISTRY.render("face_verification", gauges={
+        "ready": warmup_state["ready"],
+        "pool_pending": verification_pool.pending,
+        "embedding_cache_entries": cache.get("entries")
+    }, counters={
+        "pool_rejected": verification_pool.rejected,
+        "embedding_cache_hits": cache.get("hits"),
+        "embedding_cache_misses": cache.get("misses")
+    })
+    return PlainTextResponse(text, media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.post("/debug/profile")
+async def debug_profile(seconds: float = 10.0, interval_ms: float = 5.0):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled; set PROFILING_ENABLED=1.")
+    if not 0 < seconds <= MAX_PROFILE_SECONDS or interval_ms <= 0:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS}] and interval_ms > 0.")
+    try:
+        profiler = await run_in_threadpool(SamplingProfiler(interval_ms).run, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    path = profiler.dump(PROFILE_DIR)
+    return PlainTextResponse(profiler.folded(), headers={"X-Profile-Path": path, "X-Profile-Samples": str(profiler.samples)})
+
+@app.post("/enroll")
+async def enroll(user_id: str = Form(...), image: UploadFile = File(...)):
+    try:
+        image_bytes = await read_image_bytes(image)
+    except UploadTooLarge:
+        return too_large_response()
+
+    # Decode, detect and embed all run on the pool
+    try:
+        represented = await verification_pool.run("represent_encoded", image_bytes)
+    except PoolSaturated:
+        return busy_response()
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"enrolled": False, "error": str(e), "message": "Face could not be detected."})
+    if represented is None:
+        return JSONResponse(status_code=400, content={"enrolled": False, "message": "Could not decode image."})
+    embedding, facial_area, timings = represented
+    REGISTRY.record(timings)
+
+    # Disk append: off the event loop
+    with REGISTRY.timer("index_add"):
+        await run_in_threadpool(face_index.add, user_id, embedding)
+    return {"enrolled": True, "user_id": user_id, "facial_area": facial_area, "gallery_size": len(face_index)}
+
+@app.post("/search")
+async def search(image: UploadFile = File(...), k: int = Form(5, ge=1)):
+    try:
+        image_bytes = await read_image_bytes(image)
+    except UploadTooLarge:
+        return too_large_response()
+
+    try:
+        represented = await verification_pool.run("represent_encoded", image_bytes)
+    except PoolSaturated:
+        return busy_response()
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e), "message": "Face could not be detected."})
+    if represented is None:
+        return JSONResponse(status_code=400, content={"message": "Could not decode image."})
+    embedding, facial_area, timings = represented
+    REGISTRY.record(timings)
+
+    # Gallery matmul: off the event loop (NumPy releases the GIL)
+    with REGISTRY.timer("index_search"):
+        matches = await run_in_threadpool(face_index.search, embedding, k)
+    return {
+        "facial_area": facial_area,
+        "threshold": verifier.threshold,
+        "matches": [
+            {"user_id": user_id, "distance": distance, "match": distance <= verifier.threshold}
+            for user_id, distance in matches
+        ]
+    }
+
+@app.post("/index/train")
+def train_index():
+    if not isinstance(face_index, IVFFaceIndex):
+        raise HTTPException(status_code=400, detail="Flat index needs no training; set FACE_INDEX_TYPE=ivf.")
+    face_index.train()
+    return face_index.stats()
+
+@app.get("/index/stats")
+def index_stats():
+    return face_index.stats()
 
 @app.post("/verify")
 async def verify_identity(
     profile_image: UploadFile = File(...),
     live_image: UploadFile = File(...)
 ):
-    
-    request_id = str(uuid.uuid4())
-    profile_path = os.path.join(TEMP_DIR, f"{request_id}_profile.jpg")
-    live_path = os.path.join(TEMP_DIR, f"{request_id}_live.jpg")
-
     try:
-       
-        with open(profile_path, "wb") as buffer:
-            shutil.copyfileobj(profile_image.file, buffer)
-        with open(live_path, "wb") as buffer:
-            shutil.copyfileobj(live_image.file, buffer)
-
-      
-        if os.path.getsize(live_path) < 1024 * 5: 
-             return JSONResponse(status_code=400, content={"verified": False, "message": "Image too small or low quality."})
+        # Everything stays in memory: no temp files, each image decoded exactly once
+        start = time.perf_counter()
+        try:
+            profile_bytes = await read_upload(profile_image, MAX_UPLOAD_BYTES)
+            live_bytes = await read_upload(live_image, MAX_UPLOAD_BYTES)
+        except UploadTooLarge:
+            return too_large_response()
+        read_ms = (time.perf_counter() - start) * 1000
+        REGISTRY.observe("read", read_ms)
 
+        if len(live_bytes) < MIN_IMAGE_BYTES:
+             return JSONResponse(status_code=400, content={"verified": False, "message": "Image too small or low quality."})
 
-        result = verifier.verify(profile_path, live_path)
-        
-        os.remove(profile_path)
-        os.remove(live_path)
+        # Decode, detect, embed and compare all run on the pool
+        start = time.perf_counter()
+        try:
+            result = await verification_pool.run("verify_encoded", profile_bytes, live_bytes)
+        except PoolSaturated:
+            return busy_response()
+        # Time on the pool beyond the stages themselves is queueing and hand-off
+        pool_ms = (time.perf_counter() - start) * 1000
 
         if "error" in result:
              return JSONResponse(status_code=400, content=result)
 
+        REGISTRY.record(result["timings_ms"])
+        REGISTRY.observe("pool_wait", max(pool_ms - sum(result["timings_ms"].values()), 0.0))
+        result["timings_ms"]["read"] = round(read_ms, 2)
         return result
 
     except Exception as e:
-        if os.path.exists(profile_path):
-            os.remove(profile_path)
-        if os.path.exists(live_path):
-            os.remove(live_path)
-            
         return JSONResponse(status_code=500, content={"verified": False, "error": str(e)})
 
 if __name__ == "__main__":
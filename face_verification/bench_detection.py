@@ -0,0 +1,120 @@
+"""
+Detection latency and match accuracy vs the detector's maximum image side.
+
+Builds synthetic 12 MP scenes (textured background, face photo pasted at a
+random position and 15-35 % of the short side) from a directory of face
+photos, two scenes per photo. For each detect_max_side setting it reports
+detection p50 latency, detection rate, embedding drift against the
+full-resolution pipeline (cosine distance) and same/different-person
+decision accuracy and agreement with full resolution.
+
+    python bench_detection.py faces_dir/          # e.g. a few LFW identities
+    python bench_detection.py faces_dir/ --sizes 0,2048,1280,960
+
+Without a faces directory, plain ellipses stand in for faces: only the
+latency numbers are meaningful then.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+import cv2
+import numpy as np
+from image_preprocess import load_image
+from verification import FaceVerifier
+
+SCENE_SIZE = (4000, 3000)
+
+
+def make_scene(rng, face, size=SCENE_SIZE):
+    width, height = size
+    # Smooth random texture: a tiny random image blown up, plus sensor noise
+    background = cv2.resize(rng.integers(0, 255, (12, 16, 3), dtype=np.uint8), (width, height), interpolation=cv2.INTER_CUBIC)
+    scene = np.clip(background.astype(np.int16) + rng.integers(-8, 8, (height, width, 3)), 0, 255).astype(np.uint8)
+
+    side = int(min(width, height) * rng.uniform(0.15, 0.35))
+    scale = side / max(face.shape[:2])
+    resized = cv2.resize(face, (int(face.shape[1] * scale), int(face.shape[0] * scale)), interpolation=cv2.INTER_CUBIC)
+    x = int(rng.integers(0, width - resized.shape[1]))
+    y = int(rng.integers(0, height - resized.shape[0]))
+    scene[y:y + resized.shape[0], x:x + resized.shape[1]] = resized
+    return scene
+
+
+def synthetic_faces(count=4):
+    faces = []
+    for i in range(count):
+        face = np.full((300, 240, 3), 40 + 50 * i, dtype=np.uint8)
+        cv2.ellipse(face, (120, 150), (90, 120), 0, 0, 360, (0, 0, 255), -1)
+        cv2.circle(face, (80 + 20 * i, 120), 15, (255, 255, 255), -1)
+        faces.append(face)
+    return faces
+
+
+def load_faces(faces_dir):
+    paths = sorted(
+        os.path.join(faces_dir, name) for name in os.listdir(faces_dir)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    return [load_image(path) for path in paths]
+
+
+def cosine_distance(a, b):
+    return float(1 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def run(faces, sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    # Two scenes per identity -> genuine pairs; across identities -> impostor pairs
+    scenes = [(identity, make_scene(rng, face)) for identity, face in enumerate(faces) for _ in range(2)]
+    pairs = list(itertools.combinations(range(len(scenes)), 2))
+
+    reference = None
+    rows = []
+    for max_side in sizes:
+        verifier = FaceVerifier(detect_max_side=max_side or None)
+        verifier.warm_up()
+
+        detect_ms, embeddings, detected = [], [], 0
+        for _, scene in scenes:
+            start = time.perf_counter()
+            try:
+                face, _ = verifier.detect_face(scene)
+                detected += 1
+            except ValueError:
+                face, _ = verifier.detect_face(scene, enforce_detection=False)
+            detect_ms.append((time.perf_counter() - start) * 1000)
+            embeddings.append(verifier.embed_face(face))
+
+        decisions = np.array([
+            verifier.distance(embeddings[i], embeddings[j]) <= verifier.threshold for i, j in pairs
+        ])
+        truth = np.array([scenes[i][0] == scenes[j][0] for i, j in pairs])
+        if reference is None:
+            reference = (embeddings, decisions)
+
+        rows.append({
+            "detect_max_side": max_side or "full",
+            "scene": f"{SCENE_SIZE[0]}x{SCENE_SIZE[1]}",
+            "images": len(scenes),
+            "detect_p50_ms": round(float(np.median(detect_ms)), 2),
+            "detection_rate": round(detected / len(scenes), 3),
+            "embedding_drift_vs_first": round(max(float(np.mean([
+                cosine_distance(a, b) for a, b in zip(embeddings, reference[0])
+            ])), 0.0), 5),
+            "pair_accuracy": round(float(np.mean(decisions == truth)), 3),
+            "agreement_vs_first": round(float(np.mean(decisions == reference[1])), 3)
+        })
+        print(json.dumps(rows[-1]))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("faces_dir", nargs="?", help="directory of face photos (one identity per file)")
+    parser.add_argument("--sizes", default="0,2048,1280,960,640", help="detect_max_side values; 0 = full resolution (run first as the reference)")
+    args = parser.parse_args()
+
+    faces = load_faces(args.faces_dir) if args.faces_dir else synthetic_faces()
+    run(faces, [int(size) for size in args.sizes.split(",")])
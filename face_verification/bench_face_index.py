@@ -0,0 +1,85 @@
+"""
+Query latency vs gallery size for the 1:N face index.
+
+Uses random unit vectors in place of ArcFace embeddings (same 512-d shape),
+with each query a noisy copy of an enrolled vector so recall can be measured.
+Random vectors have no cluster structure, so IVF recall here is a lower bound
+of what real face galleries (which cluster by identity) get.
+
+    python bench_face_index.py                   # 1k .. 1M gallery
+    python bench_face_index.py 10000 100000      # custom sizes
+"""
+import json
+import sys
+import time
+import numpy as np
+from face_index import FaceIndex, IVFFaceIndex, normalize
+
+DIM = 512
+QUERIES = 200
+
+
+def time_queries(index, queries, k=5):
+    latencies = []
+    top1 = []
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        top1.append(matches[0][0] if matches else None)
+    return np.asarray(latencies), top1
+
+
+def build(index, vectors):
+    # Bulk-load straight into the matrix; enrolling one by one is not what we're timing
+    with index.lock:
+        index.dim = vectors.shape[1]
+        index._ensure_capacity(len(vectors))
+        index.vectors[:len(vectors)] = vectors
+        index.ids = list(range(len(vectors)))
+        index.rows = {i: i for i in range(len(vectors))}
+        index.count = len(vectors)
+    return index
+
+
+def run(sizes):
+    rng = np.random.default_rng(0)
+    results = []
+    for size in sizes:
+        gallery = normalize(rng.standard_normal((size, DIM), dtype=np.float32))
+        targets = rng.choice(size, QUERIES, replace=False)
+        queries = gallery[targets] + 0.05 * rng.standard_normal((QUERIES, DIM), dtype=np.float32)
+
+        flat = build(FaceIndex(), gallery)
+        flat_ms, flat_top1 = time_queries(flat, queries)
+
+        row = {
+            "gallery_size": size,
+            "flat_p50_ms": round(float(np.percentile(flat_ms, 50)), 3),
+            "flat_p95_ms": round(float(np.percentile(flat_ms, 95)), 3),
+            "flat_recall_at_1": float(np.mean([t == i for t, i in zip(flat_top1, targets)]))
+        }
+
+        if size >= 10000:
+            nlist = int(4 * np.sqrt(size))
+            ivf = build(IVFFaceIndex(nlist=nlist, nprobe=max(16, nlist // 16)), gallery)
+            start = time.perf_counter()
+            ivf.train()
+            row["ivf_train_s"] = round(time.perf_counter() - start, 2)
+            ivf_ms, ivf_top1 = time_queries(ivf, queries)
+            row.update({
+                "ivf_nlist": nlist,
+                "ivf_nprobe": ivf.nprobe,
+                "ivf_p50_ms": round(float(np.percentile(ivf_ms, 50)), 3),
+                "ivf_p95_ms": round(float(np.percentile(ivf_ms, 95)), 3),
+                "ivf_recall_at_1": float(np.mean([t == i for t, i in zip(ivf_top1, targets)]))
+            })
+
+        print(json.dumps(row))
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000, 1000000]
+    run(sizes)
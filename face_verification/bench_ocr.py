@@ -0,0 +1,103 @@
+"""
+OCR accuracy vs latency for the ID-card preprocessing presets.
+
+Renders synthetic high-resolution ID cards (text lines, a face photo block,
+scanner noise) and, for each OCRPreprocessor preset, measures preprocessing
+time, end-to-end extract_text time and recall of the validate_id_details
+keywords printed on the card. Without Tesseract installed only the
+preprocessing numbers are reported.
+
+    python bench_ocr.py            # 10 cards per preset
+    python bench_ocr.py 25
+"""
+import json
+import sys
+import time
+import cv2
+import numpy as np
+import pytesseract
+from ocr import OCRPreprocessor
+from id_verification import IDVerifier
+
+CARD_LINES = [
+    "REPUBLIC OF EXAMPLELAND",
+    "GOVERNMENT IDENTITY CARD",
+    "Name: JANE DOE",
+    "Date of Birth: 01/02/1990",
+    "DOB 01021990",
+    "ID No: 123456789012",
+]
+EXPECTED_KEYWORDS = ['Name', 'DOB', 'Date of Birth', 'No', 'ID', 'REPUBLIC', 'GOVERNMENT']
+
+
+def render_card(rng, width=3000):
+    """Returns (bgr_image, face_area) for a synthetic card ~ 890 DPI wide."""
+    height = int(width / 1.586)
+    card = np.full((height, width, 3), 235, dtype=np.uint8)
+    card[:] = card + rng.integers(0, 15, 3, dtype=np.uint8)
+
+    face_area = {"x": int(width * 0.05), "y": int(height * 0.25), "w": int(width * 0.25), "h": int(height * 0.6)}
+    x, y, w, h = (face_area[k] for k in ("x", "y", "w", "h"))
+    card[y:y + h, x:x + w] = rng.integers(90, 160, dtype=np.uint8)
+    cv2.ellipse(card, (x + w // 2, y + h // 2), (w // 3, h // 3), 0, 0, 360, (60, 80, 120), -1)
+
+    text_x = int(width * 0.36)
+    line_height = int(height * 0.12)
+    for i, line in enumerate(CARD_LINES):
+        cv2.putText(card, line, (text_x, int(height * 0.15) + i * line_height), cv2.FONT_HERSHEY_SIMPLEX,
+                    width / 1500, (20, 20, 20), max(width // 600, 2), cv2.LINE_AA)
+
+    noise = rng.normal(0, 12, card.shape)
+    card = np.clip(card.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    return card, face_area
+
+
+def run(cards_per_preset=10):
+    rng = np.random.default_rng(0)
+    cards = [render_card(rng) for _ in range(cards_per_preset)]
+    results = []
+
+    for preset in OCRPreprocessor.PRESETS:
+        verifier = IDVerifier(ocr_preprocess=preset)
+        preprocess_ms, extract_ms, recalls = [], [], []
+        tesseract_available = True
+
+        for card, face_area in cards:
+            start = time.perf_counter()
+            pieces = verifier.ocr_preprocessor.prepare(card, face_area)
+            preprocess_ms.append((time.perf_counter() - start) * 1000)
+
+            if not tesseract_available:
+                continue
+            try:
+                pytesseract.get_tesseract_version()
+            except pytesseract.TesseractNotFoundError:
+                tesseract_available = False
+                continue
+
+            start = time.perf_counter()
+            text = verifier.extract_text(card, face_area)
+            extract_ms.append((time.perf_counter() - start) * 1000)
+            found = verifier.validate_id_details(text)["found_keywords"]
+            recalls.append(len(found) / len(EXPECTED_KEYWORDS))
+
+        row = {
+            "preset": preset,
+            "config": OCRPreprocessor.PRESETS[preset],
+            "ocr_pieces": len(pieces),
+            "preprocess_p50_ms": round(float(np.median(preprocess_ms)), 2),
+        }
+        if extract_ms:
+            row.update({
+                "extract_text_p50_ms": round(float(np.median(extract_ms)), 2),
+                "keyword_recall": round(float(np.mean(recalls)), 3)
+            })
+        else:
+            row["note"] = "Tesseract not found; OCR latency and accuracy not measured."
+        print(json.dumps(row))
+        results.append(row)
+    return results
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,206 @@
+"""
+Offline bulk verification for backfills (e.g. re-verifying every user after
+a threshold change).
+
+Reads a manifest of image paths, one row per user, as CSV or JSONL:
+
+    user_id,id_card,selfie,profile
+    u1,cards/u1.jpg,selfies/u1.jpg,
+    u2,,selfies/u2.jpg,profiles/u2.jpg
+
+Rows with an id_card run the full KYC check (IDVerifier.verify_user);
+rows with only a profile photo run FaceVerifier.verify(profile, selfie).
+Relative paths are resolved against the manifest's directory.
+
+Work is sharded across a process pool; every worker loads the models once
+and keeps them for its lifetime. Results are appended to a JSONL file as
+they complete, which doubles as the checkpoint: rerunning the same command
+skips rows already in the output. With --store, embeddings and distances
+also go to a VerificationStore for rethreshold.py.
+
+    python bulk_verify.py manifest.csv -o results.jsonl --workers 8
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+# Per-process verifier, built once by the pool initializer
+_id_verifier = None
+
+
+def _init_worker(model_name, detector_backend, ocr_preprocess, threads, store_dir):
+    global _id_verifier
+    # Cap native thread pools before TensorFlow/OpenCV load, so N workers
+    # don't each spin up one thread per core
+    for var in ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[var] = str(threads)
+    import cv2
+    cv2.setNumThreads(threads)
+    from id_verification import IDVerifier
+    from verification_store import VerificationStore
+
+    # verify_user narrates every step; keep worker output off the console
+    sys.stdout = open(os.devnull, "w")
+    store = VerificationStore(store_dir) if store_dir else None
+    _id_verifier = IDVerifier(model_name=model_name, detector_backend=detector_backend,
+                              ocr_preprocess=ocr_preprocess, verification_store=store)
+    _id_verifier.face_verifier.warm_up()
+
+
+def _verify_row(row):
+    start = time.perf_counter()
+    result = {"row": row["row"], "user_id": row.get("user_id")}
+    try:
+        if row.get("id_card"):
+            result["mode"] = "id_card"
+            result.update(_id_verifier.verify_user(row["id_card"], row["selfie"], record_key=row.get("user_id")))
+        elif row.get("profile"):
+            result["mode"] = "profile"
+            result.update(_id_verifier.face_verifier.verify(row["profile"], row["selfie"], record_key=row.get("user_id")))
+        else:
+            raise ValueError("Row needs an id_card or a profile image next to the selfie.")
+    except Exception as e:
+        result.update({"verified": False, "error": str(e)})
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def _verify_chunk(rows):
+    return [_verify_row(row) for row in rows]
+
+
+def read_manifest(path):
+    """Yields manifest rows as dicts with a 0-based "row" number and absolute paths."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    is_jsonl = path.endswith((".jsonl", ".ndjson"))
+    with open(path, newline="") as f:
+        records = (json.loads(line) for line in f if line.strip()) if is_jsonl else csv.DictReader(f)
+        for i, record in enumerate(records):
+            row = {"row": i, "user_id": record.get("user_id") or record.get("id")}
+            for column in ("id_card", "selfie", "profile"):
+                value = (record.get(column) or "").strip()
+                row[column] = os.path.join(base_dir, value) if value else None
+            yield row
+
+
+def completed_rows(output_path):
+    """
+    Row numbers already present in an existing output file. A trailing
+    partial line (from a killed run) is truncated so appends stay valid JSONL.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.splitlines():
+        if line.strip():
+            done.add(json.loads(line)["row"])
+    return done
+
+
+def _json_default(value):
+    # numpy scalars (facial areas, distances) from DeepFace
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(manifest, output, workers=None, model_name="ArcFace", detector_backend="opencv",
+        ocr_preprocess="accurate", chunk_size=8, resume=True, progress_every=10.0, store_dir=None):
+    """Verifies every manifest row not yet in `output`. Returns a summary dict."""
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    if not resume and os.path.exists(output):
+        os.remove(output)
+    done = completed_rows(output)
+    pending_rows = (row for row in read_manifest(manifest) if row["row"] not in done)
+
+    processed = errors = verified = 0
+    start = time.perf_counter()
+    last_report = start
+
+    # spawn: workers import TensorFlow themselves, after their thread caps are set
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                             initargs=(model_name, detector_backend, ocr_preprocess, threads, store_dir)) as pool, \
+            open(output, "a") as out:
+        chunks = _chunks(pending_rows, chunk_size)
+        in_flight = set()
+        # Keep a bounded number of chunks queued so huge manifests aren't loaded up front
+        while True:
+            while len(in_flight) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight.add(pool.submit(_verify_chunk, chunk))
+            if not in_flight:
+                break
+
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for result in future.result():
+                    out.write(json.dumps(result, default=_json_default) + "\n")
+                    processed += 1
+                    errors += "error" in result
+                    verified += bool(result.get("verified"))
+            out.flush()
+
+            now = time.perf_counter()
+            if now - last_report >= progress_every:
+                print(f"{processed} pairs, {processed / (now - start):.1f} pairs/sec", file=sys.stderr)
+                last_report = now
+
+    elapsed = time.perf_counter() - start
+    return {
+        "processed": processed,
+        "skipped_from_checkpoint": len(done),
+        "verified": verified,
+        "errors": errors,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "pairs_per_sec": round(processed / elapsed, 2) if elapsed > 0 else 0.0
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk face / ID verification from a manifest.")
+    parser.add_argument("manifest", help="CSV or JSONL with user_id, id_card, selfie, profile columns")
+    parser.add_argument("-o", "--output", help="results JSONL (default: <manifest>.results.jsonl)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--model", default="ArcFace")
+    parser.add_argument("--detector", default="opencv")
+    parser.add_argument("--ocr-preset", default="accurate", help="accurate, balanced or fast")
+    parser.add_argument("--chunk-size", type=int, default=8, help="rows sent to a worker at a time")
+    parser.add_argument("--store", help="VerificationStore directory for embeddings + distances (see rethreshold.py)")
+    parser.add_argument("--restart", action="store_true", help="ignore and overwrite existing results")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.manifest)[0] + ".results.jsonl"
+    summary = run(args.manifest, output, workers=args.workers, model_name=args.model,
+                  detector_backend=args.detector, ocr_preprocess=args.ocr_preset,
+                  chunk_size=args.chunk_size, resume=not args.restart, store_dir=args.store)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def content_hash(img):
+    """
+    SHA-256 of an image given as a file path, raw bytes or a decoded array.
+    """
+    digest = hashlib.sha256()
+    if isinstance(img, np.ndarray):
+        digest.update(f"{img.shape}{img.dtype}".encode())
+        digest.update(np.ascontiguousarray(img).tobytes())
+    elif isinstance(img, (bytes, bytearray, memoryview)):
+        digest.update(img)
+    else:
+        with open(img, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    LRU cache of face embeddings keyed by image content + model + detector settings.
+    Optionally persists entries to `disk_dir` (one .npz per key) so they
+    survive restarts and can be shared between workers.
+    """
+
+    def __init__(self, max_entries=10000, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, digest, model_name, detector_backend, detect_max_side=None):
+        """
+        Cache key for an image's content_hash() under a given model/detector.
+        detect_max_side is part of it: detecting on a downscaled copy can find
+        a slightly different face box, and so a different embedding.
+        """
+        return f"{model_name}-{detector_backend}-{detect_max_side or 'full'}-{digest}"
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npz")
+
+    def get(self, key):
+        """Returns (embedding, facial_area) or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with np.load(self._disk_path(key)) as stored:
+                    x, y, w, h = (int(v) for v in stored["facial_area"])
+                    entry = (stored["embedding"], {"x": x, "y": y, "w": w, "h": h})
+            except (OSError, ValueError, KeyError):
+                entry = None
+            if entry is not None:
+                self._remember(key, entry)
+                with self.lock:
+                    self.hits += 1
+                return entry
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, embedding, facial_area):
+        entry = (np.asarray(embedding, dtype=np.float32), facial_area)
+        self._remember(key, entry)
+
+        if self.disk_dir:
+            area = [facial_area.get(k, 0) for k in ("x", "y", "w", "h")]
+            # Write then rename so concurrent readers never see a partial file
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+            np.savez(tmp_path, embedding=entry[0], facial_area=np.asarray(area, dtype=np.int64))
+            os.replace(tmp_path, self._disk_path(key))
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_dir": self.disk_dir
+            }
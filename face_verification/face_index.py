@@ -0,0 +1,267 @@
+import json
+import os
+import threading
+import numpy as np
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.jsonl"
+CENTROIDS_FILE = "centroids.npy"
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class FaceIndex:
+    """
+    Exact 1:N search over enrolled face embeddings.
+
+    Embeddings are stored L2-normalized in one float32 matrix, so a query is a
+    single matrix-vector product (BLAS) followed by a top-k partition, and
+    cosine distance is simply 1 - dot.
+
+    With `path`, enrollments are appended to a raw float32 file and an ids
+    log, so each enroll is O(1) on disk. Re-enrolling an id replaces its
+    vector (the latest row wins when the log is replayed). Each log line
+    records the vector row it belongs to, and loading trims both files back
+    to the last enrollment they agree on, so an interrupted enroll can never
+    pair later ids with the wrong vectors.
+    """
+
+    def __init__(self, dim=None, path=None, initial_capacity=1024):
+        self.dim = dim
+        self.path = path
+        self.ids = []
+        self.rows = {}
+        self.count = 0
+        self.vectors = None
+        self.initial_capacity = initial_capacity
+        self.lock = threading.Lock()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def __len__(self):
+        return self.count
+
+    def _ensure_capacity(self, extra):
+        needed = self.count + extra
+        if self.vectors is None:
+            self.vectors = np.empty((max(self.initial_capacity, needed), self.dim), dtype=np.float32)
+        elif needed > len(self.vectors):
+            # Grow geometrically so enrolls stay amortized O(1)
+            grown = np.empty((max(needed, 2 * len(self.vectors)), self.dim), dtype=np.float32)
+            grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+
+    def _insert(self, identity_id, vector):
+        """Places one normalized vector; returns its row. Caller holds the lock."""
+        row = self.rows.get(identity_id)
+        if row is None:
+            self._ensure_capacity(1)
+            row = self.count
+            self.ids.append(identity_id)
+            self.rows[identity_id] = row
+            self.count += 1
+        self.vectors[row] = vector
+        return row
+
+    def add(self, identity_id, embedding):
+        vector = normalize(embedding).reshape(-1)
+        with self.lock:
+            if self.dim is None:
+                self.dim = len(vector)
+            if len(vector) != self.dim:
+                raise ValueError(f"Embedding has {len(vector)} dimensions, index expects {self.dim}.")
+            row = self._insert(identity_id, vector)
+            if self.path:
+                self._append_to_disk(identity_id, vector)
+            self._on_insert(row)
+        return row
+
+    def _on_insert(self, row):
+        pass
+
+    def snapshot(self):
+        """
+        Current (vectors, ids) view; later enrolls don't disturb it. ids is the
+        live append-only list (not a copy): only its first len(vectors) entries
+        belong to the view, and those never change.
+        """
+        with self.lock:
+            if self.count == 0:
+                return np.empty((0, self.dim or 0), dtype=np.float32), []
+            return self.vectors[:self.count], self.ids
+
+    def search(self, embedding, k=5):
+        """Returns up to k (identity_id, cosine_distance) pairs, closest first."""
+        vectors, ids = self.snapshot()
+        if len(vectors) == 0:
+            return []
+        query = normalize(embedding).reshape(-1)
+        return self._top_k(vectors @ query, np.arange(len(vectors)), ids, k)
+
+    @staticmethod
+    def _top_k(scores, rows, ids, k):
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(ids[rows[i]], float(1.0 - scores[i])) for i in best]
+
+    def _append_to_disk(self, identity_id, vector):
+        # Vector first, then the id line naming its row: a crash in between leaves an orphan row, never a shifted one
+        row_bytes = self.dim * 4
+        with open(os.path.join(self.path, VECTORS_FILE), "ab") as f:
+            # Drop a partial vector from an earlier failed append, so this one starts on a row boundary
+            size = f.tell()
+            if size % row_bytes:
+                f.truncate(size - size % row_bytes)
+            row = size // row_bytes
+            f.write(np.ascontiguousarray(vector, dtype=np.float32).tobytes())
+        with open(os.path.join(self.path, IDS_FILE), "a") as f:
+            f.write(json.dumps({"id": identity_id, "dim": self.dim, "row": row}) + "\n")
+
+    def _load(self):
+        ids_path = os.path.join(self.path, IDS_FILE)
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        data = b""
+        if os.path.exists(ids_path):
+            with open(ids_path, "rb") as f:
+                data = f.read()
+        # Complete lines only; a trailing partial line is from an interrupted append
+        lines = data.split(b"\n")[:-1]
+        log = [json.loads(line) for line in lines]
+        if not log:
+            # Nothing enrolled completely: drop any orphaned vector bytes
+            for path in (ids_path, vectors_path):
+                if os.path.exists(path) and os.path.getsize(path):
+                    with open(path, "r+b") as f:
+                        f.truncate(0)
+            return
+
+        self.dim = log[0]["dim"]
+        stored = np.fromfile(vectors_path, dtype=np.float32) if os.path.exists(vectors_path) else np.empty(0, np.float32)
+        available = len(stored) // self.dim
+        # Rows increase along the log, so the usable entries are a prefix of it.
+        # Logs written before rows were recorded are aligned line by line.
+        entries = []
+        for i, entry in enumerate(log):
+            row = entry.get("row", i)
+            if row >= available:
+                break
+            entries.append((entry["id"], row))
+        agreed = entries[-1][1] + 1 if entries else 0
+
+        # Trim both files to the last enrollment they agree on, so new appends line up again
+        kept_bytes = sum(len(line) + 1 for line in lines[:len(entries)])
+        if kept_bytes != len(data):
+            with open(ids_path, "r+b") as f:
+                f.truncate(kept_bytes)
+        if len(stored) != agreed * self.dim:
+            with open(vectors_path, "r+b") as f:
+                f.truncate(agreed * self.dim * 4)
+
+        stored = stored[:agreed * self.dim].reshape(agreed, self.dim)
+        self._ensure_capacity(len(entries))
+        for identity_id, row in entries:
+            self._insert(identity_id, stored[row])
+
+    def stats(self):
+        return {"type": "flat", "size": self.count, "dim": self.dim}
+
+
+class IVFFaceIndex(FaceIndex):
+    """
+    Approximate search with an inverted-file layout: embeddings are clustered
+    into `nlist` cells by spherical k-means, and a query only scans the rows
+    of its `nprobe` closest cells. Pure NumPy, no external index library.
+    Falls back to exact search until train() has been called.
+    """
+
+    def __init__(self, dim=None, path=None, nlist=1024, nprobe=16, initial_capacity=1024):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.centroids = None
+        self.assignments = []
+        self.lists = []
+        super().__init__(dim=dim, path=path, initial_capacity=initial_capacity)
+        if path and os.path.exists(os.path.join(path, CENTROIDS_FILE)):
+            self.centroids = np.load(os.path.join(path, CENTROIDS_FILE))
+            self._rebuild_lists()
+
+    def train(self, iterations=10, sample_size=100000, seed=0):
+        """Fits the coarse quantizer on (a sample of) the enrolled vectors."""
+        vectors, _ = self.snapshot()
+        nlist = min(self.nlist, len(vectors))
+        if nlist == 0:
+            raise ValueError("Cannot train an empty index.")
+
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = (sample @ centroids.T).argmax(axis=1)
+            order = np.argsort(assignment, kind="stable")
+            filled, starts = np.unique(assignment[order], return_index=True)
+            # Per-cell sums in one pass; empty cells keep their previous centroid
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            centroids[filled] = normalize(sums)
+
+        with self.lock:
+            self.centroids = centroids
+            self._rebuild_lists()
+        if self.path:
+            np.save(os.path.join(self.path, CENTROIDS_FILE), centroids)
+
+    def _assign(self, vectors):
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        # Chunked so assigning millions of rows doesn't allocate N x nlist at once
+        for start in range(0, len(vectors), 65536):
+            block = vectors[start:start + 65536]
+            assignments[start:start + len(block)] = (block @ self.centroids.T).argmax(axis=1)
+        return assignments
+
+    def _rebuild_lists(self):
+        assignments = self._assign(self.vectors[:self.count]) if self.count else np.empty(0, dtype=np.int32)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(len(self.centroids) + 1))
+        self.assignments = assignments.tolist()
+        self.lists = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(len(self.centroids))]
+
+    def _on_insert(self, row):
+        if self.centroids is None:
+            return
+        cell = int((self.centroids @ self.vectors[row]).argmax())
+        if row < len(self.assignments):
+            # Re-enrolled id: move the row to its new cell
+            self.lists[self.assignments[row]].remove(row)
+            self.assignments[row] = cell
+        else:
+            self.assignments.append(cell)
+        self.lists[cell].append(row)
+
+    def search(self, embedding, k=5):
+        if self.centroids is None:
+            return super().search(embedding, k)
+
+        query = normalize(embedding).reshape(-1)
+        with self.lock:
+            vectors = self.vectors[:self.count]
+            # Append-only: rows below count keep their ids, so no copy is needed
+            ids = self.ids
+            cells = np.argsort(-(self.centroids @ query))[:self.nprobe]
+            rows = np.fromiter((row for cell in cells for row in self.lists[cell]), dtype=np.int64)
+        if len(rows) == 0:
+            return []
+        return self._top_k(vectors[rows] @ query, rows, ids, k)
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({"type": "ivf", "trained": self.centroids is not None, "nlist": self.nlist, "nprobe": self.nprobe})
+        return stats
@@ -1,9 +1,14 @@
-import cv2
 import pytesseract
-from deepface import DeepFace
-import numpy as np
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from image_preprocess import load_image
+from metrics import REGISTRY
+from ocr import OCRPreprocessor, make_ocr_backend
+from verification import DEFAULT_DETECT_MAX_SIDE, FaceVerifier, is_whole_image
+from verification_store import piecewise_similarity
 
 # ==========================================
 # CONFIGURATION
@@ -14,44 +19,54 @@ import re
 # Linux: '/usr/bin/tesseract'
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# Sentinel for an exhausted face_areas iterator
+_MISSING = object()
+
 class IDVerifier:
-    def __init__(self, model_name="ArcFace", detector_backend="opencv", output_threshold=0.68):
+    def __init__(self, model_name="ArcFace", detector_backend="opencv", output_threshold=0.68, concurrent=False, ocr_preprocess="accurate", ocr_backend="pytesseract", verification_store=None, detect_max_side=DEFAULT_DETECT_MAX_SIDE):
         """
         Initialize the ID Verifier with DeepFace.
         :param model_name: ArcFace, VGG-Face, etc.
         :param detector_backend: opencv, retinaface, mtcnn, ssd, dlib, mediapipe
         :param output_threshold: Confidence threshold for verification.
+        :param concurrent: Run OCR and face matching in parallel by default.
+        :param ocr_preprocess: OCR preset name (accurate, balanced, fast) or an OCRPreprocessor.
+        :param ocr_backend: pytesseract, pool, auto, or an OCR backend instance.
+        :param verification_store: Optional VerificationStore to keep embeddings and distances.
+        :param detect_max_side: Downscale larger images to this side for face detection (None: full size).
         """
         self.model_name = model_name
         self.detector_backend = detector_backend
         self.output_threshold = output_threshold
+        self.concurrent = concurrent
+        self._executor = None
+        if isinstance(ocr_preprocess, str):
+            ocr_preprocess = OCRPreprocessor.preset(ocr_preprocess)
+        self.ocr_preprocessor = ocr_preprocess
+        if isinstance(ocr_backend, str):
+            ocr_backend = make_ocr_backend(ocr_backend)
+        self.ocr_backend = ocr_backend
+        # Shared detection / embedding steps (no cache: every ID card is new)
+        self.face_verifier = FaceVerifier(model_name=model_name, detector_backend=detector_backend,
+                                          verification_store=verification_store, detect_max_side=detect_max_side)
 
-    def _load_image(self, image_path):
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image not found: {image_path}")
-        return cv2.imread(image_path)
+    def _load_image(self, image):
+        """Decodes a path or bytes once; decoded arrays are passed through untouched."""
+        return load_image(image)
 
-    def extract_text(self, image):
+    def extract_text(self, image, face_area=None):
         """
         Extracts text from the ID card image using Tesseract OCR.
-        Applies preprocessing to improve accuracy.
+        Preprocessing (downscale, denoise, text-region cropping) is set by
+        self.ocr_preprocessor; the default OCRs the whole denoised card.
+        If face_area (from detection) is given, the photo is left out so it
+        doesn't produce OCR noise.
         Gracefully returns empty string if Tesseract is not installed/found.
         """
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Denoising
-            gray = cv2.fastNlMeansDenoising(gray)
-            
-            # Thresholding to get black text on white background (or vice versa)
-            # Otsu's thresholding
-            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
             # Extract text
-            custom_config = r'--oem 3 --psm 6' # PSM 6: Assume a single uniform block of text.
-            text = pytesseract.image_to_string(binary, config=custom_config)
-            
-            return text.strip()
+            texts = self.ocr_backend.image_to_string_many(self.ocr_preprocessor.prepare(image, face_area))
+            return _join_texts(texts)
         except pytesseract.TesseractNotFoundError:
             print("\n[WARNING] Tesseract OCR not found. Text extraction skipped.")
             print("To enable OCR, install Tesseract from: https://github.com/UB-Mannheim/tesseract/wiki")
@@ -60,25 +75,80 @@ class IDVerifier:
             print(f"\n[WARNING] OCR Error: {e}")
             return ""
 
-    def detect_face(self, image_path, image_type="ID Card"):
+    def extract_text_many(self, images, face_areas=None, chunk_size=64):
         """
-        Detects if a face exists in the image using DeepFace.
-        Returns True/False and coordinates if possible.
+        Streams OCR over many ID cards (paths, bytes or arrays); yields one text
+        per image, in order. Cards are preprocessed on a thread pool and each
+        chunk's text regions go to the OCR backend as one batch, so the pooled
+        engine keeps all its workers busy. Like extract_text(), a card that
+        fails to load or OCR yields "" instead of stopping the stream.
+        face_areas, if given, must have one entry per image.
         """
+        images = iter(images)
+        face_areas = iter(face_areas) if face_areas is not None else None
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as preprocess_pool:
+            while True:
+                chunk = list(islice(images, chunk_size))
+                if not chunk:
+                    if face_areas is not None and next(face_areas, _MISSING) is not _MISSING:
+                        raise ValueError("face_areas has more entries than images.")
+                    break
+                if face_areas is not None:
+                    areas = list(islice(face_areas, len(chunk)))
+                    if len(areas) != len(chunk):
+                        raise ValueError("face_areas has fewer entries than images.")
+                else:
+                    areas = [None] * len(chunk)
+                # None marks a card that could not be loaded or preprocessed
+                prepared = list(preprocess_pool.map(self._prepare_card, chunk, areas))
+
+                pieces = [piece for card in prepared if card is not None for piece in card]
+                try:
+                    texts = self.ocr_backend.image_to_string_many(pieces) if pieces else []
+                except pytesseract.TesseractNotFoundError:
+                    print("\n[WARNING] Tesseract OCR not found. Text extraction skipped.")
+                    texts = [""] * len(pieces)
+                except Exception as e:
+                    print(f"\n[WARNING] OCR Error: {e}")
+                    texts = [""] * len(pieces)
+
+                offset = 0
+                for card in prepared:
+                    if card is None:
+                        yield ""
+                        continue
+                    yield _join_texts(texts[offset:offset + len(card)])
+                    offset += len(card)
+
+    def _prepare_card(self, image, face_area):
+        """OCR text regions of one card, or None if it can't be loaded or preprocessed."""
         try:
-            # We use extract_faces to see if a face is detectable
-            face_objs = DeepFace.extract_faces(
-                img_path=image_path, 
-                detector_backend=self.detector_backend,
-                enforce_detection=False
-            )
-            # Filter out low confidence if needed, but extract_faces usually returns valid ones
-            if len(face_objs) > 0:
-                return face_objs[0]['facial_area'] # {'x':, 'y':, 'w':, 'h':}
+            return self.ocr_preprocessor.prepare(self._load_image(image), face_area)
+        except Exception as e:
+            print(f"\n[WARNING] OCR Error: {e}")
             return None
+
+    def detect_face(self, image, image_type="ID Card"):
+        """
+        Detects if a face exists in the image (path, bytes or array) using DeepFace.
+        Returns the facial area if possible, else None.
+        """
+        try:
+            _, facial_area = self.face_verifier.detect_face(self._load_image(image))
+            return facial_area # {'x':, 'y':, 'w':, 'h':}
         except:
             return None
 
+    def _detect_once(self, image):
+        """
+        Single detection pass shared by OCR and face matching.
+        Returns (aligned_face, facial_area, detected). Like DeepFace.verify with
+        enforce_detection=False, an image without a face is used whole.
+        """
+        image = self._load_image(image)
+        face, facial_area = self.face_verifier.detect_face(image, enforce_detection=False)
+        return face, facial_area, not is_whole_image(facial_area, image.shape)
+
     def validate_id_details(self, text):
         """
         Checks if extracted text contains expected ID keywords.
@@ -102,35 +172,81 @@ class IDVerifier:
             "cleaned_text": masked_text
         }
 
-    def verify_user(self, id_card_path, selfie_path):
+    def _ocr_branch(self, id_img, face_area):
+        start = time.perf_counter()
+        raw_text = self.extract_text(id_img, face_area=face_area)
+        text_analysis = self.validate_id_details(raw_text)
+        return raw_text, text_analysis, (time.perf_counter() - start) * 1000
+
+    def _face_branch(self, id_face, selfie_img):
+        """Selfie detection + both embeddings + distance. Returns (distance, embeddings, ms)."""
+        start = time.perf_counter()
+        selfie_face, _, _ = self._detect_once(selfie_img)
+        id_embedding = self.face_verifier.embed_face(id_face)
+        selfie_embedding = self.face_verifier.embed_face(selfie_face)
+        distance = self.face_verifier.distance(id_embedding, selfie_embedding)
+        return distance, (id_embedding, selfie_embedding), (time.perf_counter() - start) * 1000
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="id-verify")
+        return self._executor
+
+    def verify_user(self, id_card_path, selfie_path, concurrent=None, record_key=None):
+        """
+        Full KYC check of an ID card against a selfie. Both may be file paths,
+        encoded bytes or decoded BGR arrays. The ID card is decoded once and
+        face detection runs once per image; the decoded array and the detected
+        face box are shared by OCR and face matching.
+        With concurrent=True (or the instance default), OCR overlaps with face
+        matching: Tesseract runs as a separate process and OpenCV/TensorFlow
+        release the GIL, so the check takes roughly as long as the slower branch.
+        With a verification store, the embeddings and distance are kept under record_key.
+        """
+        concurrent = self.concurrent if concurrent is None else concurrent
+        total_start = time.perf_counter()
+        timings = {}
         print(f"--- Starting Verification ---")
-        print(f"ID Card: {id_card_path}")
-        print(f"Selfie: {selfie_path}")
+        if isinstance(id_card_path, str):
+            print(f"ID Card: {id_card_path}")
+        if isinstance(selfie_path, str):
+            print(f"Selfie: {selfie_path}")
 
-        # 1. Load Images for OCR (OpenCV)
+        # 1. Decode Images once (OpenCV)
+        start = time.perf_counter()
         try:
             id_img = self._load_image(id_card_path)
-            # selfie_img = self._load_image(selfie_path) # Not strictly needed for OCR, but good to check existence
+            selfie_img = self._load_image(selfie_path)
         except Exception as e:
             return {"verified": False, "error": str(e)}
+        timings["decode"] = (time.perf_counter() - start) * 1000
 
-        # 2. Extract Text from ID
-        print("Extracting text from ID...")
-        raw_text = self.extract_text(id_img)
-        text_analysis = self.validate_id_details(raw_text)
+        # 2. Detect the ID face once; OCR needs its box, face matching needs the crop
+        start = time.perf_counter()
+        face_error = None
+        id_face, id_facial_area, id_face_found = None, None, False
+        try:
+            id_face, id_facial_area, id_face_found = self._detect_once(id_img)
+        except Exception as e:
+            face_error = e
+        timings["id_detect"] = (time.perf_counter() - start) * 1000
+        ocr_face_area = id_facial_area if id_face_found else None
+
+        # 3. OCR branch and face branch, in parallel or one after the other
+        print("Extracting text from ID and verifying faces with DeepFace...")
+        face_future = None
+        if concurrent and face_error is None:
+            face_future = self._get_executor().submit(self._face_branch, id_face, selfie_img)
+        raw_text, text_analysis, timings["ocr"] = self._ocr_branch(id_img, ocr_face_area)
         print(f"Text Analysis: {text_analysis['found_keywords']}")
 
-        # 3. Detect Faces & Verify (DeepFace)
-        print("Verifying faces with DeepFace...")
         try:
-            result = DeepFace.verify(
-                img1_path=id_card_path,
-                img2_path=selfie_path,
-                model_name=self.model_name,
-                detector_backend=self.detector_backend,
-                distance_metric="cosine",
-                enforce_detection=False # Pass gracefully if no face found, handle in result
-            )
+            if face_error is not None:
+                raise face_error
+            if face_future is not None:
+                distance, embeddings, timings["face_match"] = face_future.result()
+            else:
+                distance, embeddings, timings["face_match"] = self._face_branch(id_face, selfie_img)
         except Exception as e:
             return {
                 "verified": False, 
@@ -138,23 +254,21 @@ class IDVerifier:
                 "reason": f"DeepFace Error: {str(e)}", 
                 "details": text_analysis
             }
+        timings["total"] = (time.perf_counter() - total_start) * 1000
+        REGISTRY.record(timings, prefix="kyc_")
+        self.face_verifier.record(embeddings[0], embeddings[1], distance, key=record_key)
 
-        # 4. Process Result
-        is_verified = result['verified']
-        distance = result['distance']
-        threshold = result['threshold']
+        # 5. Process Result
+        threshold = self.face_verifier.threshold
+        is_verified = distance <= threshold
         
         # Convert distance to similarity score (approximate)
         # Cosine distance: 0 (same in same dir) to 2 (opposite). Usually < 0.4 is match.
         # DeepFace thresholds vary by model. For ArcFace, it's around 0.68.
         # Let's map 0..threshold to 100..50% and threshold..1 to 50..0% roughly
-        
-        if distance <= threshold:
-            similarity = 100 - (distance / threshold) * 50 # Simply scaling 0-thresh to 100-50
-        else:
-            similarity = 50 - ((distance - threshold) / (1 - threshold)) * 50
-            if similarity < 0: similarity = 0
-            
+        # (shared with rethreshold.py so stored distances can be re-scored offline)
+        similarity = float(piecewise_similarity(distance, threshold))
+
         verification_result = "VERIFIED" if is_verified else "NOT VERIFIED"
 
         result_packet = {
@@ -164,13 +278,20 @@ class IDVerifier:
             "face_distance": round(distance, 4),
             "threshold_used": threshold,
             "model_used": self.model_name,
+            "id_face_detected": id_face_found,
+            "id_facial_area": id_facial_area,
             "ocr_text_found": bool(raw_text),
             "ocr_keywords": text_analysis['found_keywords'],
-            "masked_text_sample": text_analysis['cleaned_text'][:100] + "..." if text_analysis['cleaned_text'] else ""
+            "masked_text_sample": text_analysis['cleaned_text'][:100] + "..." if text_analysis['cleaned_text'] else "",
+            "concurrent": concurrent,
+            "timings_ms": {branch: round(ms, 2) for branch, ms in timings.items()}
         }
         
         return result_packet
 
+def _join_texts(texts):
+    return "\n".join(text.strip() for text in texts if text.strip())
+
 # ==========================================
 # EXECUTION
 # ==========================================
@@ -0,0 +1,82 @@
+import os
+import cv2
+import numpy as np
+
+
+def decode_image(data):
+    """Decodes encoded image bytes into a BGR array (None if it isn't an image)."""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def load_image(image):
+    """
+    Returns a BGR array for an image given as a file path, encoded bytes or
+    an already decoded array (returned as-is, never copied or re-decoded).
+    """
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        decoded = decode_image(image)
+        if decoded is None:
+            raise ValueError("Could not decode image bytes.")
+        return decoded
+    if not os.path.exists(image):
+        raise FileNotFoundError(f"Image not found: {image}")
+    decoded = cv2.imread(image)
+    if decoded is None:
+        raise ValueError(f"Could not decode image: {image}")
+    return decoded
+
+
+def downscale(image, max_side):
+    """
+    Shrinks an image by the smallest integer factor that brings its longer
+    side to at most max_side. Returns (image, scale) where scale = 1 / factor;
+    images already small enough come back untouched with scale 1.0.
+    An exact integer factor keeps OpenCV on its fast INTER_AREA (box filter)
+    path; the few edge pixels past a multiple of the factor are dropped.
+    """
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if not max_side or longest <= max_side:
+        return image, 1.0
+    factor = -(-longest // max_side)
+    height, width = height - height % factor, width - width % factor
+    small = cv2.resize(image[:height, :width], (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+    return small, 1.0 / factor
+
+
+def map_area(area, scale=1.0, offset=(0, 0)):
+    """
+    Maps a DeepFace facial_area (x, y, w, h and optional eye points) from a
+    scaled / cropped image back to original coordinates: divides by scale,
+    then adds the (x, y) offset of the crop.
+    """
+    dx, dy = offset
+    mapped = dict(area)
+    for key, shift in (("x", dx), ("y", dy), ("w", 0), ("h", 0)):
+        if area.get(key) is not None:
+            mapped[key] = int(round(area[key] / scale)) + shift
+    for key in ("left_eye", "right_eye"):
+        if area.get(key) is not None:
+            mapped[key] = (int(round(area[key][0] / scale)) + dx, int(round(area[key][1] / scale)) + dy)
+    return mapped
+
+
+def aligned_face(image, area):
+    """
+    Cuts the w x h face box of `area` out of `image`, rotated upright by the
+    eye line when both eyes are known (the alignment DeepFace applies).
+    A single warpAffine samples only the output pixels, so the cost depends
+    on the face size, not the image size. Out-of-image pixels are black.
+    """
+    x, y, w, h = (area[key] for key in ("x", "y", "w", "h"))
+    center = (x + w / 2, y + h / 2)
+    left_eye, right_eye = area.get("left_eye"), area.get("right_eye")
+    angle = 0.0
+    if left_eye is not None and right_eye is not None:
+        angle = float(np.degrees(np.arctan2(left_eye[1] - right_eye[1], left_eye[0] - right_eye[0])))
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    # Move the face center to the middle of the w x h output
+    matrix[:, 2] += (w / 2 - center[0], h / 2 - center[1])
+    return cv2.warpAffine(image, matrix, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
@@ -0,0 +1,19 @@
+"""
+Service entry point for the instrumentation shared by every service; the
+one implementation lives in common/service_metrics.py at the repository root.
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common"))
+
+from service_metrics import (  # noqa: E402
+    LATENCY_BUCKETS_MS,
+    PROMETHEUS_CONTENT_TYPE,
+    REGISTRY,
+    Histogram,
+    Metrics,
+    MetricsMiddleware,
+    SamplingProfiler,
+    server_timing,
+)
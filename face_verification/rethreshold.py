@@ -0,0 +1,171 @@
+"""
+Replays thresholds and similarity-score formulas over stored verification
+distances (see verification_store.py) without re-running the CNN.
+
+Reports, for every candidate threshold, the false accept rate (impostor
+pairs at or below the threshold), false reject rate (genuine pairs above
+it) and the overall verified rate, plus the equal error rate. Everything is
+vectorized over the stored columns: sorted distances + searchsorted, so a
+sweep over millions of pairs takes seconds.
+
+Ground truth comes from the labels stored with each verification, or from
+a CSV/JSONL given with --labels whose rows carry a label (1 = genuine,
+0 = impostor) and either the verification's id or a key (labels every
+verification stored under that key).
+
+Every stored verification counts. --dedupe keeps only the latest row per
+key, for stores whose key identifies one pair (e.g. bulk_verify's user_id
+after a resumed run); the API's key is the profile photo's hash, shared by
+every attempt against it, so don't dedupe those.
+
+    python rethreshold.py verification_store --labels reviewed.csv --thresholds 0.3:0.9:0.02
+    python rethreshold.py verification_store --threshold 0.6 --formula linear
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+import numpy as np
+from verification_store import GENUINE, IMPOSTOR, UNKNOWN, VerificationStore, piecewise_similarity, recompute_distances
+
+# Similarity-score formulas: (distances, threshold) -> scores in 0..100
+SIMILARITY_FORMULAS = {
+    # IDVerifier.verify_user's mapping
+    "piecewise": piecewise_similarity,
+    # Straight cosine similarity as a percentage
+    "linear": lambda distances, threshold: np.clip((1 - distances) * 100, 0, 100),
+    # Smooth, 50% at the threshold
+    "logistic": lambda distances, threshold: 100 / (1 + np.exp((distances - threshold) / 0.05)),
+}
+
+
+def parse_thresholds(spec):
+    """ "0.3:0.9:0.02" (start:stop:step, inclusive) or "0.4,0.5,0.68"."""
+    if ":" in spec:
+        start, stop, step = (float(part) for part in spec.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 6)
+    return np.array([float(part) for part in spec.split(",")])
+
+
+def read_labels(path):
+    with open(path, newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    by_id = {str(row["id"]): int(row["label"]) for row in rows if row.get("id")}
+    by_key = {str(row["key"]): int(row["label"]) for row in rows if row.get("key") and not row.get("id")}
+    return by_id, by_key
+
+
+def latest_per_key(keys):
+    """Row indices keeping only the last verification for each non-null key (resumed backfills)."""
+    last = {}
+    for i, key in enumerate(keys):
+        last[key if key is not None else ("__row__", i)] = i
+    return np.sort(np.fromiter(last.values(), dtype=np.int64, count=len(last)))
+
+
+def error_curves(distances, labels, thresholds):
+    """FAR, FRR and verified rate per threshold (a pair is accepted when distance <= threshold)."""
+    genuine = np.sort(distances[labels == GENUINE])
+    impostor = np.sort(distances[labels == IMPOSTOR])
+    everything = np.sort(distances)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        far = np.searchsorted(impostor, thresholds, side="right") / len(impostor)
+        frr = 1 - np.searchsorted(genuine, thresholds, side="right") / len(genuine)
+        verified_rate = np.searchsorted(everything, thresholds, side="right") / len(everything)
+    return far, frr, verified_rate
+
+
+def equal_error_rate(distances, labels):
+    """EER and its threshold, evaluated at every stored labeled distance."""
+    # Needs both genuine and impostor pairs, otherwise FAR or FRR is undefined everywhere
+    if not (labels == GENUINE).any() or not (labels == IMPOSTOR).any():
+        return None, None
+    candidates = np.unique(distances[labels != UNKNOWN])
+    far, frr, _ = error_curves(distances, labels, candidates)
+    best = np.nanargmin(np.abs(far - frr))
+    return float((far[best] + frr[best]) / 2), float(candidates[best])
+
+
+def score_summary(scores, labels):
+    summary = {}
+    for name, mask in (("all", np.ones(len(labels), dtype=bool)), ("genuine", labels == GENUINE), ("impostor", labels == IMPOSTOR)):
+        if mask.any():
+            p5, p50, p95 = np.percentile(scores[mask], [5, 50, 95])
+            summary[name] = {"p5": round(float(p5), 2), "p50": round(float(p50), 2), "p95": round(float(p95), 2)}
+    return summary
+
+
+def _rounded(values):
+    return [None if np.isnan(v) else round(float(v), 6) for v in values]
+
+
+def replay(store_path, thresholds, threshold=None, formula="piecewise", labels_path=None, metric=None, dedupe=False):
+    start = time.perf_counter()
+    data = VerificationStore(store_path).load()
+    rows = latest_per_key(data["keys"]) if dedupe else np.arange(len(data["keys"]))
+
+    if metric:
+        # A metric change needs the stored embeddings, still no CNN
+        distances = recompute_distances(data["embeddings"][rows], metric)
+    else:
+        distances = np.asarray(data["distances"])[rows]
+    labels = data["labels"][rows].copy()
+    if labels_path:
+        by_id, by_key = read_labels(labels_path)
+        for i, row in enumerate(rows):
+            record_id, key = data["ids"][row], data["keys"][row]
+            if record_id is not None and record_id in by_id:
+                labels[i] = by_id[record_id]
+            elif key is not None and str(key) in by_key:
+                labels[i] = by_key[str(key)]
+    load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    far, frr, verified_rate = error_curves(distances, labels, thresholds)
+    eer, eer_threshold = equal_error_rate(distances, labels)
+    if threshold is None:
+        stored = [r.get("threshold") for r in data["records"] if r.get("threshold") is not None]
+        threshold = stored[-1] if stored else 0.68
+    scores = SIMILARITY_FORMULAS[formula](distances, threshold)
+    replay_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "pairs": int(len(distances)),
+        "genuine": int((labels == GENUINE).sum()),
+        "impostor": int((labels == IMPOSTOR).sum()),
+        "curve": [
+            {"threshold": float(t), "far": a, "frr": r, "verified_rate": v}
+            for t, a, r, v in zip(thresholds, _rounded(far), _rounded(frr), _rounded(verified_rate))
+        ],
+        "eer": None if eer is None else round(eer, 6),
+        "eer_threshold": eer_threshold,
+        "scores": {"formula": formula, "threshold": threshold, **score_summary(scores, labels)},
+        "timings_ms": {"load": round(load_ms, 2), "replay": round(replay_ms, 2)}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay thresholds and similarity formulas over stored verifications.")
+    parser.add_argument("store", help="VerificationStore directory")
+    parser.add_argument("--thresholds", default="0.2:1.0:0.02", help="start:stop:step or a comma-separated list")
+    parser.add_argument("--threshold", type=float, default=None, help="threshold for similarity scores (default: stored)")
+    parser.add_argument("--formula", default="piecewise", choices=sorted(SIMILARITY_FORMULAS))
+    parser.add_argument("--labels", help="CSV/JSONL with id or key, and label (1 genuine, 0 impostor)")
+    parser.add_argument("--metric", choices=["cosine", "euclidean", "euclidean_l2"],
+                        help="recompute distances from stored embeddings with this metric")
+    parser.add_argument("--dedupe", action="store_true", help="keep only the latest verification per key")
+    args = parser.parse_args(argv)
+
+    report = replay(args.store, parse_thresholds(args.thresholds), threshold=args.threshold, formula=args.formula,
+                    labels_path=args.labels, metric=args.metric, dedupe=args.dedupe)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+from fastapi.responses import JSONResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised by read_upload when a single upload exceeds its size limit."""
+
+
+class MaxBodySizeMiddleware:
+    """
+    ASGI middleware that rejects oversized request bodies with 413 while they
+    stream in, before the multipart parser buffers them to memory or disk.
+    A too-large Content-Length is rejected without reading the body at all.
+    """
+
+    def __init__(self, app, max_bytes):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+        overflowed = False
+
+        async def limited_receive():
+            nonlocal received, overflowed
+            if overflowed:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Answer 413 here rather than raising through the app's body parser
+                    # (which would turn it into a generic 400), then make the app stop reading
+                    overflowed = True
+                    if not response_started:
+                        await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if overflowed:
+                # The 413 already went out; drop whatever the app answers to the disconnect
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except Exception:
+            # The app may raise on the simulated disconnect; the client already has its 413
+            if not overflowed:
+                raise
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(
+            status_code=413,
+            content={"verified": False, "message": f"Request body exceeds {self.max_bytes} bytes."}
+        )
+        await response(scope, receive, send)
+
+
+async def read_upload(upload, max_bytes):
+    """Reads an UploadFile into memory in chunks, stopping as soon as it exceeds max_bytes."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = await upload.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge()
+        chunks.append(chunk)
+    return b"".join(chunks)
@@ -1,37 +1,234 @@
 from deepface import DeepFace
 import os
+import time
 import cv2
 import numpy as np
+from embedding_cache import content_hash
+from image_preprocess import aligned_face, decode_image, downscale, load_image, map_area
+
+try:
+    from deepface.modules.verification import find_threshold
+except ImportError:  # older deepface releases
+    find_threshold = None
+
+# Longest image side searched by the face detector; larger images are downscaled first
+DEFAULT_DETECT_MAX_SIDE = 1280
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+def is_whole_image(area, shape):
+    # DeepFace's "no face found" region (enforce_detection=False) covers the whole image
+    return area["x"] == 0 and area["y"] == 0 and area["w"] >= shape[1] - 1 and area["h"] >= shape[0] - 1
 
 class FaceVerifier:
-    def __init__(self, model_name="ArcFace", detector_backend="opencv", distance_metric="cosine"):
+    def __init__(self, model_name="ArcFace", detector_backend="opencv", distance_metric="cosine", embedding_cache=None, verification_store=None,
+                 detect_max_side=DEFAULT_DETECT_MAX_SIDE):
         self.model_name = model_name
         self.detector_backend = detector_backend
         self.distance_metric = distance_metric
-        self.threshold = 0.68 
+        # None/0 runs detection at full resolution
+        self.detect_max_side = detect_max_side
+        self.threshold = 0.68
+        if find_threshold is not None:
+            self.threshold = find_threshold(model_name, distance_metric)
+        # Optional EmbeddingCache for images that are verified repeatedly (profile photos)
+        self.embedding_cache = embedding_cache
+        # Optional VerificationStore keeping embeddings + distances for re-thresholding
+        self.verification_store = verification_store
+        # Model handles, filled in by preload()/warm_up()
+        self.model = None
+        self.detector = None
+        self.ready = False
+
+    def preload(self):
+        """
+        Builds the recognition model and face detector once, up front.
+        DeepFace keeps built models in a process-wide cache, so later calls reuse them.
+        """
+        if self.model is None:
+            self.model = DeepFace.build_model(self.model_name)
+        if self.detector is None:
+            try:
+                self.detector = DeepFace.build_model(self.detector_backend, task="face_detector")
+            except TypeError:
+                # Older deepface builds detectors lazily and has no task argument
+                self.detector = self.detector_backend
 
-    def verify(self, img1_path, img2_path):
+    def warm_up(self):
+        """
+        Preloads the models and runs one synthetic detection + embedding, so the
+        first real request doesn't pay for graph building and lazy allocation.
+        Returns per-step milliseconds.
+        """
+        if self.ready:
+            return {}
+        timings = {}
+
+        start = time.perf_counter()
+        self.preload()
+        timings["load"] = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        DeepFace.extract_faces(
+            img_path=np.zeros((224, 224, 3), dtype=np.uint8),
+            detector_backend=self.detector_backend,
+            enforce_detection=False,
+            align=True
+        )
+        timings["detect"] = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        self.embed_face(np.zeros((112, 112, 3), dtype=np.float64))
+        timings["embed"] = _elapsed_ms(start)
+
+        self.ready = True
+        return {step: round(ms, 2) for step, ms in timings.items()}
+
+    def detect_face(self, img, enforce_detection=True):
+        """
+        Detects and aligns the first face in an image path or BGR array.
+        Returns (face, facial_area); face is the aligned RGB crop in [0, 1]
+        that DeepFace feeds to the recognition model.
+        With enforce_detection=False, an image without a detectable face is
+        returned whole instead of raising ValueError.
+        Images larger than detect_max_side are searched at reduced resolution,
+        and the face is then cut from the full-resolution image.
+        """
+        if self.detect_max_side and (isinstance(img, np.ndarray) or (isinstance(img, str) and os.path.exists(img))):
+            img = load_image(img)
+            small, scale = downscale(img, self.detect_max_side)
+            if scale < 1.0:
+                return self._detect_downscaled(img, small, scale, enforce_detection)
+
+        face_objs = DeepFace.extract_faces(
+            img_path=img,
+            detector_backend=self.detector_backend,
+            enforce_detection=enforce_detection,
+            align=True
+        )
+        return face_objs[0]["face"], face_objs[0]["facial_area"]
+
+    def _detect_downscaled(self, img, small, scale, enforce_detection):
+        """
+        Detection for large images: the detector runs on the downscaled copy
+        (cost no longer grows with camera megapixels), then the box and eye
+        points are mapped back and the aligned face is cut from the
+        full-resolution image. facial_area is in original-image coordinates.
+        """
+        found = DeepFace.extract_faces(
+            img_path=small,
+            detector_backend=self.detector_backend,
+            enforce_detection=enforce_detection,
+            align=False
+        )[0]
+        if is_whole_image(found["facial_area"], small.shape):
+            # No face and enforce_detection=False: the whole full-resolution image, as DeepFace would return it
+            face_objs = DeepFace.extract_faces(img_path=img, detector_backend="skip", enforce_detection=False)
+            return face_objs[0]["face"], face_objs[0]["facial_area"]
+
+        facial_area = map_area(found["facial_area"], scale)
+        # Same format as DeepFace's faces: RGB in [0, 1]
+        face = aligned_face(img, facial_area)[:, :, ::-1] / 255
+        return face, facial_area
+
+    def embed_face(self, face):
+        """Runs the recognition model on an aligned face crop from detect_face()."""
+        # "skip" treats the input as an already detected face, so nothing is re-detected
+        face_objs = DeepFace.represent(
+            img_path=face,
+            model_name=self.model_name,
+            detector_backend="skip",
+            enforce_detection=False,
+            align=False
+        )
+        return np.asarray(face_objs[0]["embedding"], dtype=np.float32)
+
+    def represent(self, img, timings=None):
+        """
+        Returns (embedding, facial_area) for the face in an image path or BGR array.
+        If a timings dict is given, detect/embed milliseconds are added to it.
+        """
+        start = time.perf_counter()
+        face, facial_area = self.detect_face(img)
+        detect_ms = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        embedding = self.embed_face(face)
+        embed_ms = _elapsed_ms(start)
+
+        if timings is not None:
+            timings["detect"] = timings.get("detect", 0.0) + detect_ms
+            timings["embed"] = timings.get("embed", 0.0) + embed_ms
+        return embedding, facial_area
+
+    def cached_represent(self, img, content_key=None, timings=None):
+        """
+        Same as represent(), but served from the embedding cache when this exact
+        image was seen before. Returns (embedding, facial_area, cache_hit).
+        content_key: precomputed content hash of img (e.g. of its encoded bytes).
+        """
+        if self.embedding_cache is None:
+            embedding, facial_area = self.represent(img, timings)
+            return embedding, facial_area, False
+
+        digest = content_hash(img) if content_key is None else content_key
+        key = self.embedding_cache.key(digest, self.model_name, self.detector_backend, self.detect_max_side)
+        cached = self.embedding_cache.get(key)
+        if cached is not None:
+            return cached[0], cached[1], True
+
+        embedding, facial_area = self.represent(img, timings)
+        self.embedding_cache.put(key, embedding, facial_area)
+        return embedding, facial_area, False
+
+    def distance(self, embedding1, embedding2):
+        a = np.asarray(embedding1, dtype=np.float64)
+        b = np.asarray(embedding2, dtype=np.float64)
+        if self.distance_metric == "cosine":
+            return float(1 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+        if self.distance_metric == "euclidean_l2":
+            a = a / np.linalg.norm(a)
+            b = b / np.linalg.norm(b)
+        return float(np.linalg.norm(a - b))
+
+    def record(self, embedding1, embedding2, distance, key=None):
+        """Persists one verification to the verification store, if configured."""
+        if self.verification_store is not None:
+            self.verification_store.append(
+                embedding1, embedding2, distance, key=key,
+                model=self.model_name, metric=self.distance_metric, threshold=self.threshold
+            )
+
+    def verify(self, img1_path, img2_path, img1_key=None, timings=None, record_key=None):
         """
         Verifies if two images belong to the same person.
+        Images may be file paths or decoded BGR arrays.
+        With an embedding cache, img1 (the profile image) is looked up in the
+        cache (by img1_key if given, else by its content) and only img2 goes
+        through the CNN. Per-stage milliseconds are returned in "timings_ms".
+        With a verification store, both embeddings and the distance are kept
+        under record_key (default: img1_key).
         """
+        timings = {} if timings is None else timings
         try:
-            result = DeepFace.verify(
-                img1_path=img1_path,
-                img2_path=img2_path,
-                model_name=self.model_name,
-                detector_backend=self.detector_backend,
-                distance_metric=self.distance_metric,
-                enforce_detection=True,
-                align=True
-            )
-            
+            embedding1, facial_area1, cache_hit = self.cached_represent(img1_path, img1_key, timings)
+            embedding2, facial_area2 = self.represent(img2_path, timings)
+
+            start = time.perf_counter()
+            distance = self.distance(embedding1, embedding2)
+            timings["compare"] = _elapsed_ms(start)
+            self.record(embedding1, embedding2, distance, key=img1_key if record_key is None else record_key)
+
             return {
-                "verified": result['verified'],
-                "distance": result['distance'],
-                "threshold": result['threshold'],
+                "verified": distance <= self.threshold,
+                "distance": distance,
+                "threshold": self.threshold,
                 "model": self.model_name,
                 "similarity_metric": self.distance_metric,
-                "facial_areas": result.get('facial_areas', {})
+                "facial_areas": {"img1": facial_area1, "img2": facial_area2},
+                "cache_hit": cache_hit,
+                "timings_ms": {stage: round(ms, 2) for stage, ms in timings.items()}
             }
 
         except ValueError as e:
@@ -46,3 +243,36 @@ class FaceVerifier:
                 "error": str(e),
                 "message": "An error occurred during verification."
             }
+
+    def represent_encoded(self, img_bytes):
+        """
+        represent() for encoded image bytes (e.g. uploads), decoded in memory
+        on the calling thread. Returns (embedding, facial_area, timings) with
+        decode/detect/embed milliseconds, or None if the bytes are not an image.
+        """
+        start = time.perf_counter()
+        img = decode_image(img_bytes)
+        timings = {"decode": _elapsed_ms(start)}
+        if img is None:
+            return None
+        embedding, facial_area = self.represent(img, timings)
+        return embedding, facial_area, timings
+
+    def verify_encoded(self, img1_bytes, img2_bytes):
+        """
+        verify() for encoded image bytes (e.g. uploads): decodes both images
+        once in memory and adds the decode time to the stage timings.
+        """
+        start = time.perf_counter()
+        img1 = decode_image(img1_bytes)
+        img2 = decode_image(img2_bytes)
+        timings = {"decode": _elapsed_ms(start)}
+
+        if img1 is None or img2 is None:
+            return {
+                "verified": False,
+                "error": "Could not decode image.",
+                "message": "One or both uploads are not valid images."
+            }
+        # Hash the small encoded profile bytes for the embedding cache, not the decoded pixels
+        return self.verify(img1, img2, img1_key=content_hash(img1_bytes), timings=timings)
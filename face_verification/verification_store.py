@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+import uuid
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+DISTANCES_FILE = "distances.f64"
+EMBEDDINGS_FILE = "embeddings.f32"
+RECORDS_FILE = "records.jsonl"
+LOCK_FILE = ".lock"
+
+# Ground-truth label values for stored verifications
+GENUINE = 1
+IMPOSTOR = 0
+UNKNOWN = -1
+
+
+def piecewise_similarity(distance, threshold):
+    """
+    The similarity score reported by IDVerifier.verify_user: distances
+    0..threshold map to 100..50 %, threshold..1 to 50..0 % (floored at 0).
+    Works on a scalar or a NumPy array of distances.
+    """
+    distance = np.asarray(distance, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        below = 100 - (distance / threshold) * 50
+        above = np.maximum(50 - ((distance - threshold) / (1 - threshold)) * 50, 0)
+    return np.where(distance <= threshold, below, above)
+
+
+class VerificationStore:
+    """
+    Append-only columnar store of verification results, so thresholds and
+    score formulas can be re-evaluated without re-running the CNN.
+
+    Columns live in raw files inside `path`:
+      - distances.f64: one float64 distance per verification
+      - embeddings.f32: the two float32 embeddings per verification
+      - records.jsonl: id, key, label, model, metric, threshold, time and
+        the row of the numeric columns the record belongs to
+    Files are appended under a lock (also across processes where fcntl is
+    available), and load() memory-maps the numeric columns. Every record
+    names its own row, and append() first trims the numeric columns back
+    to their common length, so an interrupted append leaves at most an
+    unreferenced row, never a shift of every later one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def append(self, embedding1, embedding2, distance, key=None, label=UNKNOWN,
+               model=None, metric=None, threshold=None):
+        pair = np.stack([
+            np.asarray(embedding1, dtype=np.float32).reshape(-1),
+            np.asarray(embedding2, dtype=np.float32).reshape(-1)
+        ])
+        record = {
+            "id": uuid.uuid4().hex,
+            "key": key,
+            "label": label,
+            "model": model,
+            "metric": metric,
+            "threshold": threshold,
+            "dim": pair.shape[1],
+            "ts": round(time.time(), 3)
+        }
+        with self.lock, open(self._file(LOCK_FILE), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            record["row"] = self._align_columns(pair.nbytes)
+            # Numeric columns first; the record line that references them is written last
+            with open(self._file(EMBEDDINGS_FILE), "ab") as f:
+                f.write(pair.tobytes())
+            with open(self._file(DISTANCES_FILE), "ab") as f:
+                f.write(np.float64(distance).tobytes())
+            with open(self._file(RECORDS_FILE), "ab") as f:
+                # A partial line from an interrupted append must not swallow this record
+                prefix = b"\n" if f.tell() and not self._ends_with_newline(f.name) else b""
+                f.write(prefix + json.dumps(record).encode() + b"\n")
+            return record["id"]
+
+    def _align_columns(self, pair_bytes):
+        """Truncates both numeric columns to the rows they both hold in full; returns that row count."""
+        paths = (self._file(EMBEDDINGS_FILE), self._file(DISTANCES_FILE))
+        sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in paths]
+        rows = min(sizes[0] // pair_bytes, sizes[1] // 8)
+        for path, size, row_bytes in zip(paths, sizes, (pair_bytes, 8)):
+            if size != rows * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(rows * row_bytes)
+        return rows
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def load(self):
+        """
+        Returns the stored columns as a dict:
+          distances (n,) float64, embeddings (n, 2, dim) float32,
+          labels (n,) int8, keys, ids, records (the raw metadata dicts).
+        Numeric columns are read-only memory maps (copies if an interrupted
+        append left unreferenced rows).
+        """
+        records_path = self._file(RECORDS_FILE)
+        records = []
+        if os.path.exists(records_path):
+            with open(records_path) as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Partial line from an interrupted append
+                        continue
+        if not records:
+            return {
+                "distances": np.empty(0, dtype=np.float64),
+                "embeddings": np.empty((0, 2, 0), dtype=np.float32),
+                "labels": np.empty(0, dtype=np.int8),
+                "keys": [],
+                "ids": [],
+                "records": []
+            }
+
+        dim = records[0]["dim"]
+        distances = np.memmap(self._file(DISTANCES_FILE), dtype=np.float64, mode="r")
+        embeddings = np.memmap(self._file(EMBEDDINGS_FILE), dtype=np.float32, mode="r")
+        n = min(len(distances), len(embeddings) // (2 * dim))
+        embeddings = embeddings[:n * 2 * dim].reshape(n, 2, dim)
+        # Stores written before records carried their row are aligned line by line
+        rows = np.array([r.get("row", i) for i, r in enumerate(records)], dtype=np.int64)
+        complete = rows < n
+        records = [r for r, keep in zip(records, complete) if keep]
+        rows = rows[complete]
+        if np.array_equal(rows, np.arange(len(rows))):
+            # Usual case, no orphaned rows: stay zero-copy
+            distances, embeddings = distances[:len(rows)], embeddings[:len(rows)]
+        else:
+            distances, embeddings = distances[rows], embeddings[rows]
+        return {
+            "distances": distances,
+            "embeddings": embeddings,
+            "labels": np.array([r.get("label", UNKNOWN) for r in records], dtype=np.int8),
+            "keys": [r.get("key") for r in records],
+            "ids": [r.get("id") for r in records],
+            "records": records
+        }
+
+    def stats(self):
+        data = self.load()
+        labels = data["labels"]
+        return {
+            "path": self.path,
+            "size": len(labels),
+            "genuine": int((labels == GENUINE).sum()),
+            "impostor": int((labels == IMPOSTOR).sum()),
+            "unlabeled": int((labels == UNKNOWN).sum())
+        }
+
+
+def recompute_distances(embeddings, metric="cosine"):
+    """Vectorized distances for (n, 2, dim) stored embedding pairs, e.g. after a metric change."""
+    a = np.asarray(embeddings[:, 0], dtype=np.float64)
+    b = np.asarray(embeddings[:, 1], dtype=np.float64)
+    if metric == "cosine":
+        return 1 - np.einsum("ij,ij->i", a, b) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    if metric == "euclidean_l2":
+        a = a / np.linalg.norm(a, axis=1, keepdims=True)
+        b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.linalg.norm(a - b, axis=1)
@@ -0,0 +1,25 @@
+"""
+Builds the service's FaceVerifier from environment variables. Kept apart
+from app.py so spawned VERIFY_POOL=process workers can build their own
+verifier without importing the app (its face index, pool and routes).
+"""
+import os
+from embedding_cache import EmbeddingCache
+from verification import DEFAULT_DETECT_MAX_SIDE, FaceVerifier
+from verification_store import VerificationStore
+
+
+def build_verifier():
+    # Profile photos are verified again and again; cache their embeddings by content hash.
+    # EMBEDDING_CACHE_DIR additionally persists them to disk (shared across workers/restarts).
+    embedding_cache = EmbeddingCache(
+        max_entries=int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000")),
+        disk_dir=os.environ.get("EMBEDDING_CACHE_DIR") or None
+    )
+    # VERIFICATION_STORE_DIR keeps every pair's embeddings + distance for offline re-thresholding
+    store_dir = os.environ.get("VERIFICATION_STORE_DIR")
+    verification_store = VerificationStore(store_dir) if store_dir else None
+    # DETECT_MAX_SIDE caps the resolution the face detector searches (0 = full resolution)
+    return FaceVerifier(model_name="ArcFace", detector_backend="opencv", embedding_cache=embedding_cache,
+                        verification_store=verification_store,
+                        detect_max_side=int(os.environ.get("DETECT_MAX_SIDE", str(DEFAULT_DETECT_MAX_SIDE))))
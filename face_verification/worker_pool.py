@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from metrics import REGISTRY
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has max_pending jobs running or queued."""
+
+
+# Per-process verifier for process pools, built once by the initializer
+_process_verifier = None
+
+
+def _init_process(verifier_factory):
+    global _process_verifier
+    _process_verifier = verifier_factory()
+    _process_verifier.warm_up()
+
+
+def _call_in_process(method, args):
+    return getattr(_process_verifier, method)(*args)
+
+
+class VerificationPool:
+    """
+    Runs blocking FaceVerifier calls off the event loop on a bounded pool.
+
+    kind="thread" shares the app's verifier (and its embedding cache);
+    kind="process" builds one verifier per worker process via
+    verifier_factory, which must be picklable (a module-level function in a
+    module the spawned workers can import cheaply, not the app itself).
+    At most `workers + max_queue` jobs are admitted; beyond that submit()
+    raises PoolSaturated so the caller can shed load (HTTP 429).
+    """
+
+    def __init__(self, verifier, kind="thread", workers=4, max_queue=16, verifier_factory=None):
+        self.verifier = verifier
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self.pending = 0
+        self.rejected = 0
+        # pending is released from the executor's threads when a job finishes
+        self.lock = threading.Lock()
+        if kind == "process":
+            # spawn, not fork: the parent has already imported TensorFlow and started threads
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_process, initargs=(verifier_factory,))
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify")
+
+    async def run(self, method, *args):
+        """Calls verifier.<method>(*args) on the pool, or raises PoolSaturated."""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated()
+            self.pending += 1
+
+        try:
+            if self.kind == "process":
+                future = self.executor.submit(_call_in_process, method, args)
+            else:
+                future = self.executor.submit(getattr(self.verifier, method), *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the job itself finishes (or is cancelled while queued), not when the
+        # caller stops waiting: a disconnected client's job still occupies the pool
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future=None):
+        with self.lock:
+            self.pending -= 1
+
+    async def warm_up(self):
+        """Warms the verifier (thread pool) or every worker process (process pool)."""
+        loop = asyncio.get_running_loop()
+        if self.kind == "process":
+            # Process workers warm up in their initializer; this makes sure all of them are started
+            await asyncio.gather(*[
+                loop.run_in_executor(self.executor, _call_in_process, "warm_up", ())
+                for _ in range(self.workers)
+            ])
+            return {}
+        return await loop.run_in_executor(self.executor, self.verifier.warm_up)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            # Count/mean/max per stage from the shared stage histograms (see /metrics)
+            "stages": REGISTRY.stage_summary()
+        }
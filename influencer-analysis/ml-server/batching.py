@@ -0,0 +1,98 @@
+import asyncio
+import numpy as np
+from metrics import REGISTRY
+
+# Histogram bucket upper bounds (powers of two); anything larger lands in "+Inf"
+HISTOGRAM_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent single-row predictions into one vectorized call.
+
+    Callers await submit(row); a background task collects rows for up to
+    window_ms (or until max_batch_size rows are waiting), scores them with
+    one call to score_fn and resolves each caller's future with its own row.
+    """
+
+    def __init__(self, score_fn, window_ms=2.0, max_batch_size=64):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.queue = None
+        self.task = None
+        self.batch_sizes = REGISTRY.histogram("predict_batch_size", HISTOGRAM_BUCKETS, "Requests per micro-batch.")
+        self.queue_depths = REGISTRY.histogram("predict_queue_depth", HISTOGRAM_BUCKETS, "Queued requests when a micro-batch starts.")
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def submit(self, row):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def _collect(self):
+        # Block for the first item, then keep the window open for stragglers
+        batch = [await self.queue.get()]
+        self.queue_depths.observe(self.queue.qsize() + 1)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            rows = [row for row, _ in batch]
+            futures = [future for _, future in batch]
+
+            self.batch_sizes.observe(len(batch))
+            self.batches += 1
+            self.items += len(batch)
+
+            try:
+                # Score off the event loop so the next window can fill meanwhile
+                results = await loop.run_in_executor(None, self.score_fn, np.vstack(rows))
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                # Caller may have gone away (client disconnect / cancellation)
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "batch_size_histogram": self.batch_sizes.to_dict(),
+            "queue_depth_histogram": self.queue_depths.to_dict()
+        }
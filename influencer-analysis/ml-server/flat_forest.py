@@ -0,0 +1,191 @@
+import json
+import os
+import shutil
+import numpy as np
+
+# sklearn marks leaves with feature == -2 (TREE_UNDEFINED); anything < 0 is a leaf
+LEAF = -2
+
+
+# Large per-node arrays, stored as one raw .npy file each so they can be memory-mapped
+ARRAY_FIELDS = ["feature", "threshold", "children_left", "children_right", "value", "roots"]
+META_FILE = "meta.json"
+
+
+def export_forest(clf, path, feature_names=None, version=None):
+    """
+    Flattens a fitted RandomForestClassifier into packed NumPy arrays and
+    saves them to the directory `path` (one .npy per array plus meta.json).
+    Node indices are global across all trees, so one array per field covers
+    the whole forest.
+    Only reads fitted attributes, so this module never imports sklearn.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in clf.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        is_leaf = left < 0
+
+        # Leaf class distributions, normalized exactly like DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :clf.n_classes_].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value = value / normalizer
+
+        features.append(np.where(is_leaf, LEAF, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        # Leaves point at themselves so traversal can run a fixed number of steps
+        lefts.append(np.where(is_leaf, np.arange(n_nodes), left) + offset)
+        rights.append(np.where(is_leaf, np.arange(n_nodes), right) + offset)
+        values.append(value)
+        roots.append(offset)
+
+        offset += n_nodes
+        max_depth = max(max_depth, tree.max_depth)
+
+    if feature_names is None:
+        feature_names = getattr(clf, "feature_names_in_", [])
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds),
+        "children_left": np.concatenate(lefts).astype(np.int32),
+        "children_right": np.concatenate(rights).astype(np.int32),
+        "value": np.concatenate(values),
+        "roots": np.asarray(roots, dtype=np.int32)
+    }
+    meta = {
+        "classes": [str(c) for c in clf.classes_],
+        "feature_names": [str(f) for f in feature_names],
+        "max_depth": int(max_depth),
+        "version": version
+    }
+
+    os.makedirs(path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+
+# Published exports live in <path>.versions/; `path` itself is a symlink to the current one
+VERSIONS_SUFFIX = ".versions"
+# Superseded exports kept on disk, so a server that resolved one just before a publish can still open it
+KEEP_VERSIONS = 3
+
+
+def publish_forest(staging, path, name):
+    """
+    Moves the export directory `staging` to <path>.versions/<name> and points
+    the `path` symlink at it. The switch is a single rename of the symlink, so
+    a reader always resolves `path` to one complete export, never a mix of two.
+    Old exports beyond KEEP_VERSIONS are removed.
+    """
+    versions = path + VERSIONS_SUFFIX
+    os.makedirs(versions, exist_ok=True)
+    target = os.path.join(versions, name)
+    os.rename(staging, target)
+
+    if os.path.isdir(path) and not os.path.islink(path):
+        # Directory left by an older train_model.py: move it aside once so the symlink can take its place
+        os.rename(path, os.path.join(versions, f"legacy-{os.getpid()}"))
+
+    link = f"{path}.link-{os.getpid()}"
+    os.symlink(os.path.relpath(target, os.path.dirname(os.path.abspath(path))), link)
+    os.replace(link, path)
+
+    current = os.path.realpath(path)
+    exports = sorted(
+        (os.path.join(versions, entry) for entry in os.listdir(versions)),
+        key=os.path.getmtime, reverse=True
+    )
+    for old in [export for export in exports if os.path.realpath(export) != current][KEEP_VERSIONS:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def resolve_forest(path):
+    """The export directory `path` currently points at (resolve once, then load everything from it)."""
+    return os.path.realpath(path)
+
+
+def artifact_size(path):
+    """Total bytes of the array files in an exported forest directory."""
+    return sum(os.path.getsize(os.path.join(path, f"{name}.npy")) for name in ARRAY_FIELDS)
+
+
+class FlatForest:
+    """
+    Array-based predictor for a forest saved with export_forest().
+    Matches RandomForestClassifier.predict_proba bit-for-bit without sklearn's
+    per-call validation overhead.
+    """
+
+    def __init__(self, feature, threshold, children_left, children_right, value, roots, classes, feature_names, max_depth, version=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.feature_names = feature_names
+        self.max_depth = int(max_depth)
+        self.version = version
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """
+        Loads an exported forest directory. With mmap_mode="r" (default) the
+        arrays are mapped read-only, so every worker process on the node
+        shares the same pages through the OS page cache.
+        """
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_FIELDS
+        }
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        return cls(
+            classes=np.asarray(meta["classes"]),
+            feature_names=np.asarray(meta["feature_names"]),
+            max_depth=meta["max_depth"],
+            version=meta.get("version"),
+            **arrays
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Returns the leaf index reached in every tree, shape (n_samples, n_estimators)."""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.repeat(self.roots[np.newaxis, :], X.shape[0], axis=0)
+
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            internal = feature >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, np.where(internal, feature, 0)] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+
+        return nodes
+
+    def predict_proba(self, X):
+        leaf_values = self.value[self.apply(X)]
+        # Sequential sum over trees (cumsum) reproduces sklearn's accumulation order exactly
+        proba = np.cumsum(leaf_values, axis=1)[:, -1, :]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -1,11 +1,21 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, conint
+from typing import List, Optional
 import joblib
+import numpy as np
 import pandas as pd
 import os
+import time
+import threading
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import json
+from batching import PredictionBatcher
+from flat_forest import FlatForest, artifact_size, resolve_forest, META_FILE
+from metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, MetricsMiddleware, SamplingProfiler
+from result_cache import ResultCache
 
 app = FastAPI(title="Influencer Analysis ML API")
 
@@ -18,23 +28,166 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stage histograms are always collected (see /metrics); SERVER_TIMING=1 also returns them per request.
+# PROFILING_ENABLED=1 exposes POST /debug/profile, which writes folded stacks to PROFILE_DIR.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+MAX_PROFILE_SECONDS = 120
+app.add_middleware(MetricsMiddleware, metrics=REGISTRY, server_timing=SERVER_TIMING)
+
 # Load Model
 MODEL_PATH = "model.joblib"
+# Flattened forest exported by train_model.py; preferred since it needs no sklearn
+FLAT_MODEL_PATH = "model_flat"
 model = None
+# Load metadata reported on the health endpoint
+model_info = {}
+# Identity of the artifact on disk that `model` was loaded from
+model_signature = None
+
+# Hot reload: POST /admin/reload, or poll the artifact every N seconds (disabled when 0)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+reload_lock = threading.Lock()
+watcher_stop = threading.Event()
+
+# Column order the model was trained on (see train_model.py)
+FEATURES = ['followers', 'views', 'likes', 'comments']
+
+# Optional micro-batching of concurrent /predict calls (disabled when window is 0)
+BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", "0"))
+BATCH_MAX_SIZE = int(os.environ.get("PREDICT_BATCH_MAX_SIZE", "64"))
+batcher = None
+
+# Repeat /predict calls for the same post are served from a result cache (RESULT_CACHE_SIZE=0 disables).
+# RESULT_CACHE_PATH points all workers at one SQLite file so they share hits.
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "10000"))
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_SIZE,
+    ttl_s=float(os.environ.get("RESULT_CACHE_TTL_S", "300")),
+    shared_path=os.environ.get("RESULT_CACHE_PATH") or None
+) if RESULT_CACHE_SIZE > 0 else None
+
+# Feature counts are scored as int64; anything outside that range is a 422, not an OverflowError
+Count = conint(ge=0, le=np.iinfo(np.int64).max)
 
 # Input Schema
 class AnalysisRequest(BaseModel):
-    followers: int
-    views: int
-    likes: int
-    comments: int
+    followers: Count
+    views: Count
+    likes: Count
+    comments: Count
+
+# Batch Input Schema: either a list of items or one list per feature (columnar)
+class BatchAnalysisRequest(BaseModel):
+    items: Optional[List[AnalysisRequest]] = None
+    followers: Optional[List[Count]] = None
+    views: Optional[List[Count]] = None
+    likes: Optional[List[Count]] = None
+    comments: Optional[List[Count]] = None
+
+    def to_matrix(self):
+        if self.items is not None:
+            return np.array([[item.followers, item.views, item.likes, item.comments] for item in self.items], dtype=np.int64).reshape(-1, len(FEATURES))
+        columns = [getattr(self, name) for name in FEATURES]
+        if any(column is None for column in columns):
+            raise ValueError("Provide either 'items' or all of: " + ", ".join(FEATURES))
+        if len({len(column) for column in columns}) != 1:
+            raise ValueError("Columnar fields must all have the same length.")
+        return np.column_stack([np.asarray(column, dtype=np.int64) for column in columns]).reshape(-1, len(FEATURES))
+
+def memory_usage_mb():
+    """
+    Resident and shared memory of this worker in MB, from /proc/self/statm.
+    Shared pages include memory-mapped model arrays, which the OS page cache
+    holds once for all workers. Returns None where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            _, resident, shared = f.read().split()[:3]
+    except OSError:
+        return None
+    page_mb = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    return {"rss_mb": round(int(resident) * page_mb, 2), "shared_mb": round(int(shared) * page_mb, 2)}
+
+def predict_proba(estimator, X):
+    if isinstance(estimator, FlatForest):
+        with REGISTRY.timer("inference"):
+            return estimator.predict_proba(X)
+    # Single DataFrame per batch so feature names match training
+    with REGISTRY.timer("dataframe"):
+        frame = pd.DataFrame(X, columns=FEATURES)
+    with REGISTRY.timer("inference"):
+        return estimator.predict_proba(frame)
+
+def artifact_signature(flat_path=None):
+    """Identifies the artifact on disk; changes whenever train_model.py publishes a new one."""
+    if flat_path is None and os.path.isdir(FLAT_MODEL_PATH):
+        flat_path = resolve_forest(FLAT_MODEL_PATH)
+    path = os.path.join(flat_path, META_FILE) if flat_path else MODEL_PATH
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_ino, stat.st_mtime_ns)
+
+def load_artifact():
+    """
+    Loads and warms up the model artifact without touching the served model.
+    Returns (model, info, signature), or (None, None, None) if nothing is on disk.
+    """
+    # Resolve the published export once: every file below comes from the same directory
+    flat_path = resolve_forest(FLAT_MODEL_PATH) if os.path.isdir(FLAT_MODEL_PATH) else None
+    signature = artifact_signature(flat_path)
+    start = time.perf_counter()
+    if flat_path:
+        # Memory-mapped: workers share the arrays instead of each holding a copy
+        loaded = FlatForest.load(flat_path, mmap_mode="r")
+        info = {"format": "flat", "path": flat_path, "mmap": True, "artifact_bytes": artifact_size(flat_path), "version": loaded.version}
+    elif os.path.exists(MODEL_PATH):
+        loaded = joblib.load(MODEL_PATH)
+        mtime = os.path.getmtime(MODEL_PATH)
+        info = {"format": "joblib", "path": MODEL_PATH, "mmap": False, "version": time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(mtime))}
+    else:
+        return None, None, None
+    info["load_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    # Dummy prediction so first real request doesn't pay for page faults / lazy init
+    start = time.perf_counter()
+    predict_proba(loaded, np.zeros((1, len(FEATURES)), dtype=np.int64))
+    info["warmup_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    info["loaded_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    return loaded, info, signature
+
+def reload_model():
+    """Loads the artifact off the request path, then swaps the global model reference."""
+    global model, model_info, model_signature
+    with reload_lock:
+        loaded, info, signature = load_artifact()
+        if loaded is None:
+            return False
+        # Single assignment: in-flight requests finish on the model they already hold
+        model, model_info, model_signature = loaded, info, signature
+        if result_cache is not None:
+            # Keys carry the version, so entries of the old model could never hit again anyway
+            result_cache.invalidate(info["version"])
+        return True
+
+def watch_model():
+    while not watcher_stop.wait(MODEL_WATCH_INTERVAL):
+        if artifact_signature() == model_signature:
+            continue
+        try:
+            if reload_model():
+                print(f"Model reloaded: version {model_info['version']} ({model_info['load_ms']} ms)")
+        except Exception as e:
+            # Keep serving the current model; retry on the next poll
+            print(f"Model reload failed: {e}")
 
 @app.on_event("startup")
 def load_model():
-    global model
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        print("Model loaded successfully.")
+    if reload_model():
+        print(f"Model loaded successfully ({model_info['format']}, version {model_info['version']}).")
     else:
         print("Model not found. Please run train_model.py first.")
         # Optional: Auto-train if missing
@@ -42,45 +195,177 @@ def load_model():
         # train()
         # model = joblib.load(MODEL_PATH)
 
+    if MODEL_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_model, name="model-watcher", daemon=True).start()
+        print(f"Watching model artifact every {MODEL_WATCH_INTERVAL} s.")
+
+@app.on_event("shutdown")
+def stop_watcher():
+    watcher_stop.set()
+
+@app.post("/admin/reload")
+def admin_reload():
+    try:
+        reloaded = reload_model()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {e}")
+    if not reloaded:
+        raise HTTPException(status_code=404, detail="Model not found. Run train_model.py first.")
+    return {"reloaded": True, "model": model_info}
+
+@app.on_event("startup")
+async def start_batcher():
+    global batcher
+    if BATCH_WINDOW_MS > 0:
+        batcher = PredictionBatcher(score_matrix, window_ms=BATCH_WINDOW_MS, max_batch_size=BATCH_MAX_SIZE)
+        batcher.start()
+        print(f"Micro-batching enabled ({BATCH_WINDOW_MS} ms window, max {BATCH_MAX_SIZE} items).")
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    if batcher is not None:
+        await batcher.stop()
+
 @app.get("/")
 def home():
-    return {"status": "ML Server Running", "model_loaded": model is not None}
+    status = {"status": "ML Server Running", "model_loaded": model is not None}
+    if model is not None:
+        status["model"] = model_info
+    status["memory"] = memory_usage_mb()
+    if batcher is not None:
+        status["batching"] = batcher.stats()
+    if result_cache is not None:
+        status["result_cache"] = result_cache.stats()
+    return status
 
-@app.post("/predict")
-def predict(data: AnalysisRequest):
-    if not model:
-        raise HTTPException(status_code=500, detail="Model not loaded. Run train_model.py first.")
-    
-    # Prepare input DataFrame (names must match training)
-    input_df = pd.DataFrame([{
-        'followers': data.followers,
-        'views': data.views,
-        'likes': data.likes,
-        'comments': data.comments
-    }])
-    
-    # Predict Category
-    prediction = model.predict(input_df)[0]
-    probabilities = model.predict_proba(input_df)[0]
-    
-    # Get highest probability score
-    classes = model.classes_
-    confidence = max(probabilities)
-    
+@app.get("/metrics")
+def metrics():
+    memory = memory_usage_mb() or {}
+    cache = result_cache.stats() if result_cache is not None else {}
+    text = REGISTRY.render("influencer_ml", gauges={
+        "model_loaded": model is not None,
+        "rss_mb": memory.get("rss_mb"),
+        "shared_mb": memory.get("shared_mb"),
+        "result_cache_entries": cache.get("entries")
+    }, counters={
+        "result_cache_hits": cache.get("hits"),
+        "result_cache_shared_hits": cache.get("shared_hits"),
+        "result_cache_misses": cache.get("misses")
+    })
+    return PlainTextResponse(text, media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.post("/debug/profile")
+def debug_profile(seconds: float = 10.0, interval_ms: float = 5.0):
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled; set PROFILING_ENABLED=1.")
+    if not 0 < seconds <= MAX_PROFILE_SECONDS or interval_ms <= 0:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS}] and interval_ms > 0.")
+    try:
+        profiler = SamplingProfiler(interval_ms).run(seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    path = profiler.dump(PROFILE_DIR)
+    return PlainTextResponse(profiler.folded(), headers={"X-Profile-Path": path, "X-Profile-Samples": str(profiler.samples)})
+
+def score_matrix(X):
+    """
+    Scores an (n, 4) feature matrix in one forest pass.
+    Returns one result dict per row, same shape as the /predict response.
+    """
+    # Hold one reference so a concurrent hot reload can't split a batch across models
+    current = model
+    probabilities = predict_proba(current, X)
+
+    # Category is the argmax of the probabilities (same as model.predict)
+    best = probabilities.argmax(axis=1)
+    categories = current.classes_[best]
+    confidences = probabilities[np.arange(len(best)), best]
+
+    start = time.perf_counter()
     # Calculate simple Virality Score (0-100) based on engagement logic + model confidence
-    # Heuristic: (Likes + Comments) / Views normalized 
-    engagement_rate = (data.likes + data.comments) / (data.views + 1)
+    # Heuristic: (Likes + Comments) / Views normalized
+    # In float64: int64 sums of counts near the schema's upper bound would wrap around
+    engagement_rates = (X[:, 2].astype(np.float64) + X[:, 3]) / (X[:, 1] + 1.0)
     # Cap at 15% for score of 100
-    virality_score = min(int((engagement_rate / 0.15) * 100), 100)
-    
-    return {
-        "category": prediction,
-        "confidence": float(confidence),
-        "virality_score": virality_score,
-        "metrics_analyzed": {
-            "er": f"{engagement_rate:.2%}"
+    virality_scores = np.minimum((engagement_rates / 0.15) * 100, 100).astype(np.int64)
+
+    results = [
+        {
+            "category": str(category),
+            "confidence": float(confidence),
+            "virality_score": int(virality_score),
+            "metrics_analyzed": {
+                "er": f"{engagement_rate:.2%}"
+            }
         }
-    }
+        for category, confidence, virality_score, engagement_rate
+        in zip(categories, confidences, virality_scores, engagement_rates)
+    ]
+    REGISTRY.observe("postprocess", (time.perf_counter() - start) * 1000)
+    return results
+
+@app.post("/predict")
+async def predict(data: AnalysisRequest):
+    if not model:
+        raise HTTPException(status_code=500, detail="Model not loaded. Run train_model.py first.")
+
+    X = np.array([[data.followers, data.views, data.likes, data.comments]], dtype=np.int64)
+    if result_cache is None:
+        if batcher is not None:
+            # Queueing + the shared batch; the batch's own stages are recorded on the scoring thread
+            with REGISTRY.timer("batch_wait"):
+                return await batcher.submit(X)
+        return (await run_in_threadpool(score_matrix, X))[0]
+
+    # Version read before scoring: a concurrent reload can only leave an unreachable old-version entry
+    key = result_cache.key(model_info["version"], X[0])
+    # Memory hits are answered on the loop; SQLite reads and writes only ever run in the threadpool
+    cached = result_cache.get_local(key)
+    if cached is not None:
+        return cached
+    if batcher is None:
+        return await run_in_threadpool(score_cached, X, key)
+
+    cached = await cache_io(result_cache.get_shared, key)
+    if cached is not None:
+        return cached
+    with REGISTRY.timer("batch_wait"):
+        result = await batcher.submit(X)
+    await cache_io(result_cache.put, key, result)
+    return result
+
+async def cache_io(fn, *args):
+    """Runs a result-cache call, off the event loop when it touches the shared SQLite store."""
+    if result_cache.shared is None:
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+def score_cached(X, key):
+    """Shared-cache lookup, scoring and store for one row in a single threadpool hop."""
+    with REGISTRY.timer("cache_lookup"):
+        cached = result_cache.get_shared(key)
+    if cached is not None:
+        return cached
+    result = score_matrix(X)[0]
+    result_cache.put(key, result)
+    return result
+
+@app.post("/predict/batch")
+def predict_batch(data: BatchAnalysisRequest):
+    if not model:
+        raise HTTPException(status_code=500, detail="Model not loaded. Run train_model.py first.")
+
+    try:
+        with REGISTRY.timer("to_matrix"):
+            X = data.to_matrix()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(X) == 0:
+        return {"count": 0, "results": []}
+
+    results = score_matrix(X)
+    return {"count": len(results), "results": results}
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,199 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of /predict results keyed by the model version and the
+    request's feature values. The dashboard re-sends the same post on every
+    page view, so repeats are answered without a forest pass.
+
+    Entries are only valid for the model version they were scored with;
+    invalidate() drops everything when a new model is loaded. With
+    `shared_path`, results are also kept in a SQLite file that all uvicorn
+    workers on the host read and write, so a hit in one worker is a hit in all.
+    """
+
+    def __init__(self, max_entries=10000, ttl_s=300.0, shared_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_s
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.shared = SharedResultStore(shared_path, max_entries) if shared_path else None
+
+    def key(self, version, row):
+        """Cache key for one feature row under a model version."""
+        return (str(version),) + tuple(int(value) for value in row)
+
+    def get(self, key):
+        """Returns the cached result dict or None (memory first, then the shared store)."""
+        result = self.get_local(key)
+        if result is None:
+            result = self.get_shared(key)
+        return result
+
+    def get_local(self, key):
+        """In-memory lookup only; never blocks on I/O, so it is safe on the event loop."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self.entries[key]
+                self.expired += 1
+        return None
+
+    def get_shared(self, key):
+        """Shared-store lookup after a get_local() miss (blocking SQLite I/O); counts the miss."""
+        if self.shared is not None:
+            result, ttl_left = self.shared.get(key)
+            if result is not None:
+                # Keep the shared expiry so workers agree on when an entry goes stale
+                self._remember(key, result, time.monotonic() + ttl_left)
+                with self.lock:
+                    self.shared_hits += 1
+                return result
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        """Stores a result; with a shared store this writes to SQLite, so call it off the event loop."""
+        self._remember(key, result, time.monotonic() + self.ttl)
+        if self.shared is not None:
+            self.shared.put(key, result, self.ttl)
+
+    def _remember(self, key, result, expires_at):
+        with self.lock:
+            self.entries[key] = (expires_at, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, version=None):
+        """Drops every entry; with a version, shared entries of that version survive."""
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+        if self.shared is not None:
+            self.shared.invalidate(version)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "invalidations": self.invalidations,
+                "shared_path": self.shared.path if self.shared is not None else None
+            }
+
+
+class SharedResultStore:
+    """
+    Results in a SQLite file (WAL mode) shared by every worker process on
+    the host. Expiry uses wall-clock time so all processes agree on it.
+    Each thread opens its own connection; sqlite3 connections are not
+    shareable across threads.
+    """
+
+    # Expired and surplus rows are purged once every this many writes
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self.writes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        connection.commit()
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            # WAL without a sync per commit: a crash can lose recent entries, which is fine for a cache
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    @staticmethod
+    def _text_key(key):
+        return "|".join(str(part) for part in key)
+
+    def get(self, key):
+        """Returns (result, seconds until expiry), or (None, 0) on a miss."""
+        now = time.time()
+        try:
+            row = self._connection().execute(
+                "SELECT result, expires_at FROM results WHERE key = ?", (self._text_key(key),)
+            ).fetchone()
+        except sqlite3.Error:
+            # A locked or unreadable store degrades to a miss, never to a failed request
+            return None, 0.0
+        if row is None or row[1] <= now:
+            return None, 0.0
+        return json.loads(row[0]), row[1] - now
+
+    def put(self, key, result, ttl_s):
+        connection = self._connection()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO results (key, version, result, expires_at) VALUES (?, ?, ?, ?)",
+                    (self._text_key(key), key[0], json.dumps(result), time.time() + ttl_s)
+                )
+            self.writes += 1
+            if self.writes % self.PRUNE_EVERY == 0:
+                self.prune()
+        except sqlite3.Error:
+            pass
+
+    def prune(self):
+        """Deletes expired rows, then the soonest-expiring rows beyond max_entries."""
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+            connection.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def invalidate(self, version=None):
+        connection = self._connection()
+        try:
+            with connection:
+                if version is None:
+                    connection.execute("DELETE FROM results")
+                else:
+                    connection.execute("DELETE FROM results WHERE version != ?", (str(version),))
+        except sqlite3.Error:
+            pass
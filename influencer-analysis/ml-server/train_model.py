@@ -5,6 +5,12 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
 import joblib
 import os
+import shutil
+import time
+from flat_forest import export_forest, publish_forest, FlatForest
+
+FEATURES = ['followers', 'views', 'likes', 'comments']
+FLAT_MODEL_PATH = 'model_flat'
 
 # 1. Generate Synthetic Data
 # We simulate social media posts to train the model to recognize "Viral" vs "Average" patterns.
@@ -28,6 +34,28 @@ def generate_data(n_samples=2000):
         'comments': comments
     })
     
+    return label_data(df)
+
+def generate_data_chunks(n_samples, chunk_size=1_000_000, seed=42):
+    """
+    Streaming variant of generate_data for large datasets: yields labeled
+    DataFrames of at most chunk_size rows. Chunk i draws from its own
+    numpy Generator seeded by (seed, i), so output is reproducible.
+    """
+    for i, start in enumerate(range(0, n_samples, chunk_size)):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i,)))
+        n = min(chunk_size, n_samples - start)
+        views = rng.integers(10, 5000000, n)
+        likes = (views * rng.uniform(0.01, 0.15, n)).astype(np.int64)
+        df = pd.DataFrame({
+            'followers': rng.integers(100, 1000000, n),
+            'views': views,
+            'likes': likes,
+            'comments': (likes * rng.uniform(0.01, 0.10, n)).astype(np.int64)
+        })
+        yield label_data(df)
+
+def label_data(df):
     # 2. Define "Labels" based on rules (Ground Truth for our synthetic model)
     # We calculate Engagement Rate (ER) = (Likes + Comments) / Views
     # (Using Views as base for content performance, Followers for reach context)
@@ -45,11 +73,37 @@ def generate_data(n_samples=2000):
     
     return df
 
+def write_data(path, n_samples, chunk_size=1_000_000, seed=42):
+    """
+    Streams generate_data_chunks to a CSV, or Parquet for a .parquet path
+    (needs pyarrow), with memory bounded by chunk_size. Written to a temp
+    file and renamed. Returns the number of rows written.
+    """
+    tmp_path = f"{path}.tmp"
+    rows, writer = 0, None
+    try:
+        for chunk in generate_data_chunks(n_samples, chunk_size, seed):
+            if path.endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp_path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return rows
+
 def train():
     print("Generating synthetic data...")
     df = generate_data()
     
-    X = df[['followers', 'views', 'likes', 'comments']]
+    X = df[FEATURES]
     y = df['category']
     
     # Train/Test Split
@@ -63,9 +117,45 @@ def train():
     print("Model Evaluation:")
     print(classification_report(y_test, clf.predict(X_test)))
     
-    # Save
-    joblib.dump(clf, 'model.joblib')
+    # Save (write to a temp file and rename, so a running server never reads a partial file)
+    version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    joblib.dump(clf, 'model.joblib.tmp')
+    os.replace('model.joblib.tmp', 'model.joblib')
     print("Model saved to model.joblib")
 
+    export_flat_model(clf, X, version=version)
+
+def export_flat_model(clf, X, path=FLAT_MODEL_PATH, version=None):
+    """
+    Exports the forest as packed arrays for the sklearn-free server predictor,
+    then checks the flat predictor against predict_proba on the given rows.
+    The verified export becomes a new versioned directory and `path` (a
+    symlink) is switched to it atomically; running servers keep mapping the
+    previous directory until they hot-reload the new version.
+    """
+    staging = f"{path}.tmp-{os.getpid()}"
+    export_forest(clf, staging, feature_names=FEATURES, version=version)
+    flat = FlatForest.load(staging, mmap_mode=None)
+
+    expected = clf.predict_proba(X)
+    actual = flat.predict_proba(np.asarray(X))
+    if not np.array_equal(expected, actual) or not np.array_equal(flat.classes_, clf.classes_.astype(str)):
+        shutil.rmtree(staging)
+        raise RuntimeError("Flat forest export does not match predict_proba; not saved.")
+
+    publish_forest(staging, path, f"{version or 'unversioned'}-{os.getpid()}")
+    print(f"Flat model {version} saved to {path} (verified against predict_proba on {len(X)} rows)")
+
 if __name__ == "__main__":
-    train()
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the post classifier, or just generate data.")
+    parser.add_argument('--generate', metavar='PATH', help="stream synthetic data to a .csv/.parquet file instead of training")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.generate:
+        print(f"{write_data(args.generate, args.rows, args.chunk_size, args.seed)} rows saved to {args.generate}")
+    else:
+        train()